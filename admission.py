@@ -0,0 +1,193 @@
+import asyncio
+import collections
+import contextlib
+import logging
+
+from gopher_client import GopherSearchError
+
+logger = logging.getLogger(__name__)
+
+# Lanes in dispatch order: cheap lookups first, expensive archive scans, then work nobody waits on
+LANE_FAST = 'fast'
+LANE_NORMAL = 'normal'
+LANE_SLOW = 'slow'
+LANE_BACKGROUND = 'background'
+LANES = (LANE_FAST, LANE_NORMAL, LANE_SLOW, LANE_BACKGROUND)
+
+FAST_SEARCH_TYPES = ('getbyid', 'getprofile', 'getprofilebyid', 'gettrends', 'getspace')
+SLOW_SEARCH_TYPES = ('searchbyfullarchive',)
+
+
+def lane_for(search_type: str) -> str:
+    if search_type in FAST_SEARCH_TYPES:
+        return LANE_FAST
+    if search_type in SLOW_SEARCH_TYPES:
+        return LANE_SLOW
+    return LANE_NORMAL
+
+
+class _Waiter:
+    __slots__ = ('user', 'lane', 'future', 'on_position', 'position')
+
+    def __init__(self, user, lane: str, future, on_position) -> None:
+        self.user = user
+        self.lane = lane
+        self.future = future
+        self.on_position = on_position
+        self.position = None
+
+
+class AdmissionController:
+    """Bounds concurrent upstream searches, globally and per user, with fair queueing.
+
+    Waiting searches sit in one lane per cost class. Free slots go to the fast lane
+    first and the slow lane never holds more than slow_limit slots, so lookups are not
+    stuck behind archive scans. Within a lane users are served round-robin, one search
+    each, so a user with many queued searches cannot starve the others.
+
+    Background searches (cache refreshes, /watch) are not subject to the per-user
+    quotas; they are served last and hold at most background_limit slots.
+    """
+
+    def __init__(self, max_concurrent: int = 20, per_user: int = 2, max_queued_per_user: int = 10,
+                 slow_limit: int = None, background_limit: int = None) -> None:
+        self.max_concurrent = max_concurrent
+        self.per_user = per_user
+        self.max_queued_per_user = max_queued_per_user
+        self.slow_limit = slow_limit if slow_limit is not None else max(1, max_concurrent // 4)
+        self.background_limit = background_limit if background_limit is not None else max(1, max_concurrent // 4)
+        self._lane_limits = {LANE_SLOW: self.slow_limit, LANE_BACKGROUND: self.background_limit}
+        # lane -> user -> waiters; the user order is the round-robin order
+        self._lanes = {lane: collections.OrderedDict() for lane in LANES}
+        self._running = 0
+        self._running_by_user = collections.Counter()
+        self._running_by_lane = collections.Counter()
+        self._queued_by_user = collections.Counter()
+
+    def running(self) -> int:
+        return self._running
+
+    def queued(self) -> int:
+        return sum(self._queued_by_user.values())
+
+    @contextlib.asynccontextmanager
+    async def admit(self, user, search_type: str, on_position=None, background: bool = False):
+        """Hold a search slot for the duration of the block.
+
+        on_position(position) is called while the search waits, whenever its place in
+        the queue changes. Raises GopherSearchError if the user has too many queued,
+        unless background is set.
+        """
+        lane = await self.acquire(user, search_type, on_position, background)
+        try:
+            yield
+        finally:
+            self.release(user, lane)
+
+    def check(self, user, background: bool = False) -> None:
+        """Raise GopherSearchError now if acquire() would reject the user's search"""
+        if not background and self._queued_by_user[user] >= self.max_queued_per_user:
+            raise GopherSearchError(
+                f"⚠️ You already have {self._queued_by_user[user]} searches waiting.\n\n"
+                f"Please wait for them to finish before starting more.",
+                'rejected'
+            )
+
+    async def acquire(self, user, search_type: str, on_position=None, background: bool = False) -> str:
+        lane = LANE_BACKGROUND if background else lane_for(search_type)
+        self.check(user, background)
+
+        waiter = _Waiter(user, lane, asyncio.get_running_loop().create_future(), on_position)
+        self._lanes[lane].setdefault(user, collections.deque()).append(waiter)
+        self._queued_by_user[user] += 1
+        self._dispatch()
+        if waiter.future.done():
+            return lane
+
+        logger.info("Search for %s queued in %s lane (%s waiting, %s running)",
+                    user, lane, self.queued(), self._running)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller went away: hand the slot on
+                self.release(user, lane)
+            else:
+                self._remove(waiter)
+                self._dispatch()
+            raise
+        return lane
+
+    def release(self, user, lane: str) -> None:
+        self._running -= 1
+        self._running_by_lane[lane] -= 1
+        self._running_by_user[user] -= 1
+        if self._running_by_user[user] <= 0:
+            del self._running_by_user[user]
+        self._dispatch()
+
+    def _remove(self, waiter: _Waiter) -> None:
+        users = self._lanes[waiter.lane]
+        queue = users.get(waiter.user)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del users[waiter.user]
+            self._dequeued(waiter.user)
+
+    def _dequeued(self, user) -> None:
+        self._queued_by_user[user] -= 1
+        if self._queued_by_user[user] <= 0:
+            del self._queued_by_user[user]
+
+    def _next_waiter(self):
+        for lane in LANES:
+            limit = self._lane_limits.get(lane)
+            if limit is not None and self._running_by_lane[lane] >= limit:
+                continue
+            users = self._lanes[lane]
+            for user in list(users):
+                if lane != LANE_BACKGROUND and self._running_by_user[user] >= self.per_user:
+                    continue
+                queue = users[user]
+                waiter = queue.popleft()
+                if queue:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                self._dequeued(user)
+                return waiter
+        return None
+
+    def _dispatch(self) -> None:
+        granted = False
+        while self._running < self.max_concurrent:
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            self._running += 1
+            self._running_by_lane[waiter.lane] += 1
+            self._running_by_user[waiter.user] += 1
+            waiter.future.set_result(None)
+            granted = True
+        if granted or self.queued():
+            self._report_positions()
+
+    def _report_positions(self) -> None:
+        """Tell each waiter its projected place: lane by lane, users round-robin"""
+        position = 0
+        for lane in LANES:
+            queues = list(self._lanes[lane].values())
+            depth = 0
+            while queues:
+                for queue in queues:
+                    position += 1
+                    waiter = queue[depth]
+                    if waiter.on_position is not None and waiter.position != position:
+                        waiter.position = position
+                        try:
+                            waiter.on_position(position)
+                        except Exception as e:
+                            logger.warning("Queue position callback failed: %s", e)
+                depth += 1
+                queues = [queue for queue in queues if len(queue) > depth]
@@ -0,0 +1,151 @@
+"""Micro-benchmark: result rendering throughput, legacy string concatenation vs renderer.py
+
+The legacy loop reads the raw API dicts (and parses dates) while rendering; renderer.py
+renders records that parse_items built beforehand. Parsing and rendering are timed
+separately and together, and the speedup compares the legacy loop with both.
+
+Usage: python benchmarks/bench_renderer.py [--items 5000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from renderer import RULE, pack_chunks, render_items  # noqa: E402
+from result_model import parse_items  # noqa: E402
+
+
+def make_items(count: int) -> list:
+    """Synthetic tweets shaped like /search/live/result items"""
+    rng = random.Random(42)
+    words = ["gopher", "data", "ai", "web3", "python", "🚀", "trend", "live", "search", "日本語"]
+    items = []
+    for n in range(count):
+        content = " ".join(rng.choice(words) for _ in range(rng.randint(5, 80)))
+        items.append({
+            'id': str(10 ** 18 + n),
+            'source': 'twitter',
+            'content': content,
+            'metadata': {
+                'username': f"user{n % 997}",
+                'created_at': f"2024-0{1 + n % 9}-1{n % 10}T1{n % 10}:3{n % 10}:00Z",
+                'tweet_id': str(10 ** 18 + n),
+                'public_metrics': {
+                    'like_count': rng.randint(0, 5000),
+                    'retweet_count': rng.randint(0, 500),
+                    'reply_count': rng.randint(0, 50),
+                    'quote_count': rng.randint(0, 5),
+                },
+            },
+        })
+    return items
+
+
+def legacy_render(header: str, data_list: list) -> list:
+    """The original display_search_results loop (all items), kept here for comparison"""
+    result_text = header
+    result_text += f"📊 Found {len(data_list)} results:\n\n"
+    result_text += "=" * 40 + "\n\n"
+    for i, item in enumerate(data_list, 1):
+        if not isinstance(item, dict):
+            continue
+        content = item.get('content') or item.get('text', '')
+        tweet_id = item.get('id', '')
+        metadata = item.get('metadata', {})
+        if content:
+            display_content = content[:300] + "..." if len(content) > 300 else content
+            result_text += f"[{i}] {display_content}\n\n"
+        else:
+            result_text += f"[{i}] (No content)\n\n"
+        if metadata:
+            username = metadata.get('username', '')
+            if username:
+                result_text += f"   👤 @{username}\n"
+            created_at = metadata.get('created_at', '')
+            if created_at:
+                try:
+                    from datetime import datetime
+                    dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+                    formatted_date = dt.strftime('%Y-%m-%d %H:%M')
+                    result_text += f"   📅 {formatted_date} UTC\n"
+                except ValueError:
+                    result_text += f"   📅 {created_at}\n"
+            public_metrics = metadata.get('public_metrics', {})
+            if public_metrics:
+                likes = public_metrics.get('like_count', 0)
+                retweets = public_metrics.get('retweet_count', 0)
+                replies = public_metrics.get('reply_count', 0)
+                quotes = public_metrics.get('quote_count', 0)
+                if likes > 0 or retweets > 0 or replies > 0:
+                    result_text += "   📊 "
+                    metrics = []
+                    if likes > 0:
+                        metrics.append(f"❤️ {likes}")
+                    if retweets > 0:
+                        metrics.append(f"🔄 {retweets}")
+                    if replies > 0:
+                        metrics.append(f"💬 {replies}")
+                    if quotes > 0:
+                        metrics.append(f"📝 {quotes}")
+                    result_text += " | ".join(metrics) + "\n"
+            tweet_id_meta = metadata.get('tweet_id') or metadata.get('id')
+            if tweet_id_meta and username:
+                result_text += f"   🔗 https://twitter.com/{username}/status/{tweet_id_meta}\n"
+            elif tweet_id:
+                result_text += f"   🆔 ID: {tweet_id}\n"
+        result_text += "\n" + "-" * 40 + "\n\n"
+    return [result_text[i:i + 4000] for i in range(0, len(result_text), 4000)]
+
+
+def new_render(header: str, records: list) -> list:
+    head = f"{header}📊 Found {len(records)} results:\n\n{RULE}"
+    return pack_chunks(head, render_items(records))
+
+
+def parse(header: str, items: list) -> list:
+    return parse_items('searchbyquery', items)
+
+
+def parse_and_render(header: str, items: list) -> list:
+    return new_render(header, parse_items('searchbyquery', items))
+
+
+def bench(name: str, func, header: str, items: list, repeat: int, unit: str = "messages") -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = func(header, items)
+        best = min(best, time.perf_counter() - start)
+    rate = len(items) / best
+    print(f"{name:>14}: {best * 1000:8.2f} ms  {rate:12,.0f} items/s  {len(output)} {unit}")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    header = (
+        "✅ SEARCH COMPLETED\n\n"
+        "🎯 Type: searchbyquery\n"
+        "📝 Query: gopher\n"
+        "🌐 Platform: twitter\n\n"
+    )
+    print(f"Rendering {args.items} items, best of {args.repeat}")
+    legacy = bench("legacy", legacy_render, header, items, args.repeat)
+    # In the bot, items are parsed into records once, when the search result arrives
+    parsed = bench("parse", parse, header, items, args.repeat, unit="records")
+    rendered = bench("render", new_render, header, parse_items('searchbyquery', items), args.repeat)
+    new = bench("parse + render", parse_and_render, header, items, args.repeat)
+    print(f"speedup, parse + render: {legacy / new:.1f}x (render alone {legacy / rendered:.1f}x, "
+          f"parse is {parsed / new:.0%} of parse + render)")
+
+
+if __name__ == '__main__':
+    main()
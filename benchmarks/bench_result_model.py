@@ -0,0 +1,57 @@
+"""Micro-benchmark: memory of cached results as decoded JSON dicts vs result_model records
+
+Usage: python benchmarks/bench_result_model.py [--items 10000] [--content-chars 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mock_gopher import make_items  # noqa: E402
+from result_model import parse_items, records_nbytes  # noqa: E402
+
+
+def measure(build) -> tuple:
+    """(bytes still allocated by what build() returns, seconds it took under tracemalloc)"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    value = build()
+    elapsed = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del value
+    return size, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--content-chars', type=int, default=200)
+    args = parser.parse_args()
+
+    body = json.dumps(make_items(args.items, args.content_chars)).encode('utf-8')
+    dict_bytes, dict_seconds = measure(lambda: json.loads(body))
+    # The decoded dicts are freed once parsed, as when a result is compacted before caching
+    record_bytes, record_seconds = measure(lambda: parse_items('searchbyquery', json.loads(body)))
+
+    print(f"{args.items} items, {args.content_chars} content chars, body {len(body) / 1e6:.1f} MB")
+    print(f"   dicts: {dict_bytes / args.items:8.0f} B/item  (json.loads {dict_seconds * 1000:.1f} ms)")
+    print(f" records: {record_bytes / args.items:8.0f} B/item  (json.loads + parse_items {record_seconds * 1000:.1f} ms)")
+    print(f"   ratio: {dict_bytes / record_bytes:.1f}x")
+    # What the result cache is charged for the records
+    estimate = records_nbytes(parse_items('searchbyquery', json.loads(body)))
+    print(f"estimate: {estimate / args.items:8.0f} B/item  (records_nbytes)")
+    # Both keep the same content strings; the rest is what the record layout saves
+    content_bytes = sum(sys.getsizeof(item['content']) for item in make_items(args.items, args.content_chars))
+    print(f"  without content text: {(dict_bytes - content_bytes) / args.items:.0f} vs "
+          f"{(record_bytes - content_bytes) / args.items:.0f} B/item "
+          f"({(dict_bytes - content_bytes) / (record_bytes - content_bytes):.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""End-to-end search benchmark against the local mock Gopher API and fake Telegram Bot API
+
+Runs --searches searches through execute_gopher_search (status message, polling, rendering,
+outbound queue) with --concurrency in flight, entirely offline, and reports searches/s,
+p50/p99 time-to-result, upstream polls per search and outbound Telegram calls per search.
+
+Usage: python benchmarks/bench_search.py [--searches 500] [--concurrency 50]
+           [--script empty*2,list] [--items 100] [--distinct 500] [--no-rate-limit]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fake_telegram import FakeTelegramAPI  # noqa: E402
+from mock_gopher import MockGopherAPI  # noqa: E402
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def make_update(bot, n: int, text: str, update_id: int = None):
+    """A private-chat text message from user n, as Telegram would deliver it"""
+    from telegram import Update
+    user_id = 100000 + n
+    update_id = n if update_id is None else update_id
+    entities = [{'type': 'bot_command', 'offset': 0, 'length': len(text.split()[0])}] if text.startswith('/') else []
+    return Update.de_json({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id + 1,
+            'entities': entities,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private', 'first_name': "Bench"},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': "Bench"},
+            'text': text,
+        },
+    }, bot)
+
+
+async def run(args) -> None:
+    gopher = await MockGopherAPI(
+        script=args.script, items=args.items, content_chars=args.content_chars,
+        start_latency=args.start_latency, poll_latency=args.poll_latency
+    ).start()
+    telegram = await FakeTelegramAPI(latency=args.telegram_latency).start()
+
+    # main reads its configuration at import time
+    os.environ['GOPHER_API_BASE'] = gopher.url
+    os.environ['TELEGRAM_API_BASE'] = telegram.url
+    os.environ.setdefault('TELEGRAM_BOT_TOKEN', "123456:bench")
+    if args.no_rate_limit:
+        os.environ['TELEGRAM_GLOBAL_RATE'] = "1000000"
+        os.environ['TELEGRAM_CHAT_RATE'] = "1000000"
+    import main as bot
+    logging.getLogger().setLevel(logging.WARNING)
+
+    application = bot.build_application()
+    await application.initialize()
+    await bot.post_init(application)
+
+    latencies = []
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def one_search(n: int) -> None:
+        async with slots:
+            query = f"bench query {n % args.distinct}"
+            update = make_update(application.bot, n, query)
+            state = {'step': 'query', 'platform': 'twitter', 'search_type': 'searchbyquery', 'query': query}
+            started = time.perf_counter()
+            progress = bot.ProgressTracker(bot.outbound, update.message)
+            await progress.start("🔄 Starting search...")
+            await bot.execute_gopher_search(update, state, progress)
+            latencies.append(time.perf_counter() - started)
+
+    print(f"{args.searches} searches, {args.concurrency} concurrent, script {args.script}, "
+          f"{args.items} items, {args.distinct} distinct queries")
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one_search(n) for n in range(args.searches)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await bot.post_shutdown(application)
+        await application.shutdown()
+        await gopher.stop()
+        await telegram.stop()
+
+    failures = {labels: value for _, labels, value in bot.SEARCH_FAILURES.samples()}
+    print(f"  searches/s:        {args.searches / elapsed:10.1f}")
+    print(f"  time-to-result:    p50 {percentile(latencies, 0.5) * 1000:8.1f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms")
+    print(f"  upstream searches: {gopher.searches:10d}   polls/search {gopher.polls / max(1, gopher.searches):6.2f}")
+    print(f"  outbound calls:    {telegram.total_calls:10d}   per search {telegram.total_calls / args.searches:6.2f}"
+          f"   ({', '.join(f'{m} {c}' for m, c in telegram.calls.most_common() if m != 'getMe')})")
+    if failures:
+        print(f"  failures:          {', '.join(f'{labels} {value:g}' for labels, value in failures.items())}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--searches', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--script', default="empty*2,list", help="mock poll script, see mock_gopher.py")
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--content-chars', type=int, default=200)
+    parser.add_argument('--distinct', type=int, default=None,
+                        help="distinct queries (fewer than --searches exercises the result cache)")
+    parser.add_argument('--start-latency', type=float, default=0.05)
+    parser.add_argument('--poll-latency', type=float, default=0.02)
+    parser.add_argument('--telegram-latency', type=float, default=0.03)
+    parser.add_argument('--no-rate-limit', action='store_true',
+                        help="lift the outbound Telegram rate limits to measure the search path alone")
+    args = parser.parse_args()
+    args.distinct = args.distinct or args.searches
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
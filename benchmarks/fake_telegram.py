@@ -0,0 +1,152 @@
+"""Fake Telegram Bot API that accepts every call, counts it and returns plausible objects
+
+Usage: python benchmarks/fake_telegram.py [--port 8082] [--latency 0.03] [--flood-rate 0.0]
+       then run the bot with TELEGRAM_API_BASE=http://127.0.0.1:8082/bot
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import random
+import re
+import time
+from urllib.parse import parse_qsl
+
+from mock_http import MockHTTPServer
+
+_METHOD_PATH = re.compile(r"^/bot[^/]+/(\w+)$")
+_MULTIPART_FIELD = re.compile(rb'name="(\w+)"\r\n(?:[^\r\n]+\r\n)*\r\n([^\r]*)\r\n')
+
+BOT_USER = {
+    'id': 4242424242,
+    'is_bot': True,
+    'first_name': "Bench Bot",
+    'username': "bench_bot",
+    'can_join_groups': True,
+    'can_read_all_group_messages': False,
+    'supports_inline_queries': True,
+}
+
+
+def parse_params(headers: dict, body: bytes) -> dict:
+    """Decode Bot API parameters from a JSON, form or multipart body"""
+    content_type = headers.get('content-type', '')
+    if not body:
+        return {}
+    if content_type.startswith('application/json'):
+        return json.loads(body)
+    if content_type.startswith('multipart/form-data'):
+        pairs = [(k.decode(), v.decode('utf-8', errors='replace')) for k, v in _MULTIPART_FIELD.findall(body)]
+    else:
+        pairs = parse_qsl(body.decode('utf-8'))
+    params = {}
+    for key, value in pairs:
+        # python-telegram-bot JSON-encodes non-string values inside form bodies
+        try:
+            params[key] = json.loads(value)
+        except ValueError:
+            params[key] = value
+    return params
+
+
+class FakeTelegramAPI:
+    """Stand-in for https://api.telegram.org recording every method call"""
+
+    def __init__(self, latency: float = 0.03, flood_rate: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0) -> None:
+        self.latency = latency
+        self.flood_rate = flood_rate
+        self.calls = collections.Counter()
+        self.calls_by_chat = collections.Counter()
+        self._message_ids = itertools.count(1000)
+        self._server = MockHTTPServer(self.handle, host, port)
+
+    @property
+    def url(self) -> str:
+        """Value for TELEGRAM_API_BASE"""
+        return f"{self._server.url}/bot"
+
+    @property
+    def total_calls(self) -> int:
+        return sum(count for method, count in self.calls.items() if method not in ('getMe', 'getUpdates'))
+
+    async def start(self) -> 'FakeTelegramAPI':
+        await self._server.start()
+        return self
+
+    async def stop(self) -> None:
+        await self._server.stop()
+
+    def _message(self, params: dict) -> dict:
+        chat_id = int(params.get('chat_id', 1))
+        return {
+            'message_id': int(params.get('message_id') or next(self._message_ids)),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private' if chat_id > 0 else 'group'},
+            'from': BOT_USER,
+            'text': params.get('text', ''),
+        }
+
+    async def handle(self, method: str, target: str, headers: dict, body: bytes):
+        match = _METHOD_PATH.match(target.split('?')[0])
+        if not match:
+            return 404, {'ok': False, 'error_code': 404, 'description': "Not Found"}
+        api_method = match.group(1)
+        params = parse_params(headers, body)
+
+        if api_method == 'getUpdates':
+            # Nothing ever arrives; behave like an idle long poll
+            await asyncio.sleep(min(float(params.get('timeout', 1) or 1), 1.0))
+            return 200, {'ok': True, 'result': []}
+
+        self.calls[api_method] += 1
+        if 'chat_id' in params:
+            self.calls_by_chat[params['chat_id']] += 1
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+        if self.flood_rate and api_method != 'getMe' and random.random() < self.flood_rate:
+            return 429, {
+                'ok': False, 'error_code': 429,
+                'description': "Too Many Requests: retry after 1",
+                'parameters': {'retry_after': 1},
+            }
+
+        if api_method == 'getMe':
+            result = BOT_USER
+        elif api_method in ('sendMessage', 'editMessageText', 'sendDocument'):
+            result = self._message(params)
+        else:
+            result = True
+        return 200, {'ok': True, 'result': result}
+
+
+async def serve(args) -> None:
+    api = await FakeTelegramAPI(args.latency, args.flood_rate, args.host, args.port).start()
+    print(f"Fake Telegram Bot API on {api.url}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            if api.calls:
+                print(", ".join(f"{method}: {count}" for method, count in api.calls.most_common()))
+    finally:
+        await api.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--latency', type=float, default=0.03)
+    parser.add_argument('--flood-rate', type=float, default=0.0,
+                        help="fraction of calls answered with 429 retry_after")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
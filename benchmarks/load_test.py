@@ -0,0 +1,187 @@
+"""Concurrent-user load test driving the real handlers through Application.process_update
+
+Simulates --users users arriving at --rate users/s (Poisson). Each one sends /search, taps a
+search type button and sends a query, exactly as Telegram would deliver those Updates, against
+the local mock Gopher API and fake Bot API. Reports per-step latency, event-loop lag and the
+growth of search_states.
+
+Usage: python benchmarks/load_test.py [--users 2000] [--rate 100] [--think 0.5]
+           [--types searchbyquery,getbyid] [--no-rate-limit] [--trace-memory]
+"""
+import argparse
+import asyncio
+import itertools
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_search import make_update, percentile  # noqa: E402
+from fake_telegram import BOT_USER, FakeTelegramAPI  # noqa: E402
+from mock_gopher import MockGopherAPI  # noqa: E402
+
+
+def make_callback_update(bot, n: int, update_id: int, data: str):
+    """A button press on the search type keyboard sent to user n"""
+    from telegram import Update
+    user_id = 100000 + n
+    return Update.de_json({
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': {'id': user_id, 'is_bot': False, 'first_name': "Load"},
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private', 'first_name': "Load"},
+                'from': BOT_USER,
+                'text': "🔍 Choose search type:",
+            },
+        },
+    }, bot)
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic timer fires, i.e. how long the event loop was blocked"""
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+def report(name: str, values: list) -> None:
+    if not values:
+        print(f"  {name:<18} (none)")
+        return
+    print(f"  {name:<18} p50 {percentile(values, 0.5) * 1000:8.1f} ms   p99 {percentile(values, 0.99) * 1000:8.1f} ms"
+          f"   max {max(values) * 1000:8.1f} ms   n={len(values)}")
+
+
+async def run(args) -> None:
+    gopher = await MockGopherAPI(
+        script=args.script, items=args.items,
+        start_latency=args.start_latency, poll_latency=args.poll_latency
+    ).start()
+    telegram = await FakeTelegramAPI(latency=args.telegram_latency).start()
+
+    # main reads its configuration at import time
+    os.environ['GOPHER_API_BASE'] = gopher.url
+    os.environ['TELEGRAM_API_BASE'] = telegram.url
+    os.environ.setdefault('TELEGRAM_BOT_TOKEN', "123456:load")
+    if args.no_rate_limit:
+        os.environ['TELEGRAM_GLOBAL_RATE'] = "1000000"
+        os.environ['TELEGRAM_CHAT_RATE'] = "1000000"
+    import main as bot
+    logging.getLogger().setLevel(logging.WARNING)
+
+    application = bot.build_application()
+    await application.initialize()
+    await bot.post_init(application)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    update_ids = itertools.count(1)
+    search_types = args.types.split(',')
+    steps = {'search': [], 'button': [], 'query': [], 'session': []}
+    session_samples = []
+    monitor = LoopLagMonitor()
+
+    async def timed(step: str, update) -> None:
+        started = time.perf_counter()
+        await application.process_update(update)
+        steps[step].append(time.perf_counter() - started)
+
+    async def user_session(n: int) -> None:
+        started = time.perf_counter()
+        await timed('search', make_update(application.bot, n, "/search", next(update_ids)))
+        await asyncio.sleep(random.expovariate(1 / args.think) if args.think else 0)
+        data = search_types[n % len(search_types)]
+        await timed('button', make_callback_update(application.bot, n, next(update_ids), data))
+        await asyncio.sleep(random.expovariate(1 / args.think) if args.think else 0)
+        await timed('query', make_update(application.bot, n, f"load query {n % args.distinct}", next(update_ids)))
+        steps['session'].append(time.perf_counter() - started)
+
+    async def sample_sessions() -> None:
+        while True:
+            traced = tracemalloc.get_traced_memory()[0] if args.trace_memory else 0
+            session_samples.append((len(bot.search_states), traced))
+            await asyncio.sleep(0.5)
+
+    print(f"{args.users} users at {args.rate}/s, think {args.think}s, types {args.types}, script {args.script}")
+    monitor.start()
+    sampler = asyncio.create_task(sample_sessions())
+    started = time.perf_counter()
+    sessions = []
+    try:
+        for n in range(args.users):
+            sessions.append(asyncio.create_task(user_session(n)))
+            await asyncio.sleep(random.expovariate(args.rate))
+        await asyncio.gather(*sessions)
+        elapsed = time.perf_counter() - started
+    finally:
+        sampler.cancel()
+        await monitor.stop()
+        await bot.post_shutdown(application)
+        await application.shutdown()
+        await gopher.stop()
+        await telegram.stop()
+
+    print(f"  completed:         {len(steps['session'])} sessions in {elapsed:.1f}s "
+          f"({len(steps['session']) / elapsed:.1f}/s)")
+    report("/search", steps['search'])
+    report("button", steps['button'])
+    report("query → results", steps['query'])
+    report("whole session", steps['session'])
+    report("event-loop lag", monitor.lags)
+    peak_sessions = max(count for count, _ in session_samples)
+    print(f"  search_states:     peak {peak_sessions}, at end {len(bot.search_states)}")
+    if args.trace_memory:
+        peak_traced = max(traced for _, traced in session_samples)
+        print(f"  traced memory:     peak {peak_traced / 1e6:.1f} MB, "
+              f"~{peak_traced / max(1, peak_sessions) / 1e3:.1f} kB per active session")
+    print(f"  upstream searches: {gopher.searches}, outbound calls: {telegram.total_calls}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--rate', type=float, default=100.0, help="new users per second")
+    parser.add_argument('--think', type=float, default=0.5, help="mean seconds between a user's steps")
+    parser.add_argument('--types', default="searchbyquery", help="comma-separated search types to cycle through")
+    parser.add_argument('--distinct', type=int, default=None, help="distinct queries across all users")
+    parser.add_argument('--script', default="empty*2,list", help="mock poll script, see mock_gopher.py")
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--start-latency', type=float, default=0.05)
+    parser.add_argument('--poll-latency', type=float, default=0.02)
+    parser.add_argument('--telegram-latency', type=float, default=0.03)
+    parser.add_argument('--no-rate-limit', action='store_true',
+                        help="lift the outbound Telegram rate limits")
+    parser.add_argument('--trace-memory', action='store_true', help="track allocations with tracemalloc (slower)")
+    args = parser.parse_args()
+    args.distinct = args.distinct or args.users
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""Local mock of the Gopher AI search API (/search/live and /search/live/result/{uuid})
+
+Every search replays a scripted sequence of poll responses; the last step repeats.
+Steps: empty ([]), pending ({"status": "in_progress"}), list (items), wrapped ({"data": items}),
+completed ({"status": "completed", "data": items}), error ({"error": ...}),
+failed ({"status": "failed"}), unknown ({"status": "queued_somewhere"}), http500.
+A step may be repeated with *N, e.g. "empty*3,list".
+
+Usage: python benchmarks/mock_gopher.py [--port 8081] [--script empty*2,list] [--items 100]
+       then run the bot with GOPHER_API_BASE=http://127.0.0.1:8081
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import re
+
+from mock_http import MockHTTPServer
+
+_RESULT_PATH = re.compile(r"^/search/live/result/([\w-]+)$")
+
+
+def parse_script(script: str) -> list:
+    """Expand "empty*2,list" into ['empty', 'empty', 'list']"""
+    steps = []
+    for part in script.split(','):
+        name, _, count = part.strip().partition('*')
+        steps.extend([name] * int(count or 1))
+    return steps
+
+
+def make_items(count: int, content_chars: int, seed: int = 42) -> list:
+    """Tweets shaped like real /search/live/result items"""
+    rng = random.Random(seed)
+    words = ["gopher", "data", "ai", "web3", "python", "🚀", "trend", "live", "search", "日本語"]
+    items = []
+    for n in range(count):
+        content = " ".join(rng.choice(words) for _ in range(max(1, content_chars // 6)))[:content_chars]
+        items.append({
+            'id': str(10 ** 18 + n),
+            'source': 'twitter',
+            'content': content,
+            'metadata': {
+                'username': f"user{n % 997}",
+                'created_at': f"2024-0{1 + n % 9}-1{n % 10}T1{n % 10}:3{n % 10}:00Z",
+                'tweet_id': str(10 ** 18 + n),
+                'public_metrics': {
+                    'like_count': rng.randint(0, 5000),
+                    'retweet_count': rng.randint(0, 500),
+                    'reply_count': rng.randint(0, 50),
+                    'quote_count': rng.randint(0, 5),
+                },
+            },
+        })
+    return items
+
+
+class MockGopherAPI:
+    """Scriptable stand-in for GOPHER_API_BASE"""
+
+    def __init__(self, script: str = "empty*2,list", items: int = 100, content_chars: int = 200,
+                 start_latency: float = 0.05, poll_latency: float = 0.02, jitter: float = 0.2,
+                 host: str = "127.0.0.1", port: int = 0) -> None:
+        self.steps = parse_script(script)
+        self.start_latency = start_latency
+        self.poll_latency = poll_latency
+        self.jitter = jitter
+        self.searches = 0
+        self.polls = 0
+        self._progress = {}
+        self._uuids = itertools.count(1)
+        self._server = MockHTTPServer(self.handle, host, port)
+
+        # Serialise the bodies once so the mock's own CPU does not skew the benchmark
+        data = make_items(items, content_chars)
+        self._bodies = {
+            'empty': (200, b"[]"),
+            'pending': (200, b'{"status": "in_progress"}'),
+            'list': (200, json.dumps(data).encode('utf-8')),
+            'wrapped': (200, json.dumps({'data': data}).encode('utf-8')),
+            'completed': (200, json.dumps({'status': 'completed', 'data': data}).encode('utf-8')),
+            'error': (200, b'{"error": "mock upstream failure"}'),
+            'failed': (200, b'{"status": "failed", "error": "mock search failed"}'),
+            'unknown': (200, b'{"status": "queued_somewhere"}'),
+            'http500': (500, b'{"error": "mock internal error"}'),
+        }
+        unknown = set(self.steps) - set(self._bodies)
+        if unknown:
+            raise ValueError(f"Unknown script steps: {', '.join(sorted(unknown))}")
+
+    @property
+    def url(self) -> str:
+        return self._server.url
+
+    async def start(self) -> 'MockGopherAPI':
+        await self._server.start()
+        return self
+
+    async def stop(self) -> None:
+        await self._server.stop()
+
+    async def _delay(self, seconds: float) -> None:
+        if seconds > 0:
+            await asyncio.sleep(seconds * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    async def handle(self, method: str, target: str, headers: dict, body: bytes):
+        path = target.split('?')[0]
+        if method == "POST" and path == "/search/live":
+            await self._delay(self.start_latency)
+            self.searches += 1
+            uuid = f"mock-{next(self._uuids):08d}"
+            self._progress[uuid] = 0
+            return 200, {'uuid': uuid}
+
+        match = _RESULT_PATH.match(path)
+        if method == "GET" and match:
+            uuid = match.group(1)
+            if uuid not in self._progress:
+                return 404, {'error': f"unknown search {uuid}"}
+            await self._delay(self.poll_latency)
+            self.polls += 1
+            step = self._progress[uuid]
+            self._progress[uuid] = step + 1
+            return self._bodies[self.steps[min(step, len(self.steps) - 1)]]
+
+        return 404, {'error': f"no route for {method} {path}"}
+
+
+async def serve(args) -> None:
+    api = await MockGopherAPI(
+        script=args.script, items=args.items, content_chars=args.content_chars,
+        start_latency=args.start_latency, poll_latency=args.poll_latency,
+        host=args.host, port=args.port
+    ).start()
+    print(f"Mock Gopher API on {api.url} (script: {args.script})")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--script', default="empty*2,list")
+    parser.add_argument('--items', type=int, default=100)
+    parser.add_argument('--content-chars', type=int, default=200)
+    parser.add_argument('--start-latency', type=float, default=0.05)
+    parser.add_argument('--poll-latency', type=float, default=0.02)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import collections
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its circuit is open"""
+
+    def __init__(self, retry_in: float) -> None:
+        super().__init__(f"circuit open, retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Fail fast while a dependency is failing or slow.
+
+    The outcome of the last `window` calls is kept. Once at least `min_calls` are
+    recorded and the share of failures reaches failure_rate, or the share of calls
+    slower than slow_call_seconds reaches slow_rate, the circuit opens and calls are
+    refused for reset_timeout seconds. It then goes half-open and lets up to
+    half_open_probes calls through: a successful probe closes it, a failed one opens
+    it again.
+    """
+
+    def __init__(self, window: int = 20, min_calls: int = 10, failure_rate: float = 0.5,
+                 slow_call_seconds: float = 10.0, slow_rate: float = 0.5, reset_timeout: float = 30.0,
+                 half_open_probes: int = 1, name: str = "upstream") -> None:
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._calls = collections.deque(maxlen=window)
+        self._probes = 0
+
+    def _now(self) -> float:
+        return time.monotonic()
+
+    def allows(self) -> bool:
+        """True if a call would be let through right now (without claiming it)"""
+        if self.state == OPEN:
+            return self._now() - self.opened_at >= self.reset_timeout
+        if self.state == HALF_OPEN:
+            return self._probes < self.half_open_probes
+        return True
+
+    def before_call(self) -> None:
+        """Claim permission for one call; raises CircuitOpenError if refused"""
+        if self.state == OPEN:
+            remaining = self.reset_timeout - (self._now() - self.opened_at)
+            if remaining > 0:
+                raise CircuitOpenError(remaining)
+            self.state = HALF_OPEN
+            self._probes = 0
+            logger.info("Circuit %s half-open, probing", self.name)
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                raise CircuitOpenError(0)
+            self._probes += 1
+
+    def record(self, success: bool, seconds: float) -> None:
+        """Report the outcome of a call claimed with before_call"""
+        slow = seconds >= self.slow_call_seconds
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+            if success and not slow:
+                self._close()
+            else:
+                self._open("probe failed")
+            return
+        if self.state == OPEN:
+            # A call admitted before the circuit opened; its outcome no longer matters
+            return
+
+        self._calls.append((success, slow))
+        if len(self._calls) < self.min_calls:
+            return
+        failures = sum(1 for ok, _ in self._calls if not ok)
+        slow_calls = sum(1 for _, is_slow in self._calls if is_slow)
+        if failures >= self.failure_rate * len(self._calls):
+            self._open(f"{failures}/{len(self._calls)} calls failed")
+        elif slow_calls >= self.slow_rate * len(self._calls):
+            self._open(f"{slow_calls}/{len(self._calls)} calls slower than {self.slow_call_seconds:g}s")
+
+    def release(self) -> None:
+        """Give back a claimed call that finished without an outcome (e.g. cancelled)"""
+        if self.state == HALF_OPEN:
+            self._probes = max(0, self._probes - 1)
+
+    def _open(self, reason: str) -> None:
+        if self.state != OPEN:
+            logger.warning("Circuit %s opened: %s", self.name, reason)
+        self.state = OPEN
+        self.opened_at = self._now()
+        self._calls.clear()
+
+    def _close(self) -> None:
+        logger.info("Circuit %s closed", self.name)
+        self.state = CLOSED
+        self._calls.clear()
+        self._probes = 0
@@ -0,0 +1,137 @@
+import csv
+import gzip
+import io
+import json
+import logging
+import operator
+
+from result_model import PROFILE_SEARCH_TYPES, ProfileRecord, TrendRecord, TweetRecord
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+PROFILE_COLUMNS = (
+    'id', 'username', 'name', 'description', 'followers_count', 'following_count',
+    'tweet_count', 'created_at', 'url'
+)
+TWEET_COLUMNS = (
+    'tweet_id', 'item_id', 'username', 'created_at', 'content', 'like_count', 'retweet_count',
+    'reply_count', 'quote_count', 'url'
+)
+TREND_COLUMNS = ('name', 'tweet_volume')
+
+
+# Fields come from the same parsers as the records the bot shows; only created_at is
+# kept as the API sent it rather than as epoch seconds
+def profile_row(item: dict) -> dict:
+    record = ProfileRecord.from_item(item)
+    profile = item.get('metadata') or item
+    return {
+        'id': record.id,
+        'username': record.username,
+        'name': record.name,
+        'description': record.description,
+        'followers_count': record.followers,
+        'following_count': record.following,
+        'tweet_count': record.posts,
+        'created_at': profile.get('created_at'),
+        'url': f"https://twitter.com/{record.username}" if record.username else None,
+    }
+
+
+def tweet_row(item: dict) -> dict:
+    record = TweetRecord.from_item(item)
+    metadata = item.get('metadata') or {}
+    return {
+        'tweet_id': record.id,
+        'item_id': record.item_id,
+        'username': record.username,
+        'created_at': metadata.get('created_at'),
+        'content': record.content,
+        'like_count': record.likes,
+        'retweet_count': record.retweets,
+        'reply_count': record.replies,
+        'quote_count': record.quotes,
+        # A status link needs a real tweet ID, not the result item's own ID
+        'url': f"https://twitter.com/{record.username}/status/{record.id}" if record.username and record.id else None,
+    }
+
+
+def trend_row(item: dict) -> dict:
+    record = TrendRecord.from_item(item)
+    return {'name': record.name, 'tweet_volume': record.volume}
+
+
+def tweet_key(row: dict):
+    return row['tweet_id'] or row['item_id']
+
+
+def row_format(search_type: str):
+    """(columns, item -> row dict, row -> key to skip repeated items) for a search type's CSV rows"""
+    if search_type in PROFILE_SEARCH_TYPES:
+        return PROFILE_COLUMNS, profile_row, operator.itemgetter('id')
+    if search_type == 'gettrends':
+        return TREND_COLUMNS, trend_row, operator.itemgetter('name')
+    return TWEET_COLUMNS, tweet_row, tweet_key
+
+
+def next_cursor(results) -> str:
+    """Cursor for the next page of a search result, or None on the last page"""
+    if not isinstance(results, dict):
+        return None
+    cursor = results.get('next_cursor') or results.get('nextCursor') or results.get('cursor')
+    return cursor if isinstance(cursor, str) and cursor else None
+
+
+class ExportWriter:
+    """Appends search result items to a CSV or JSONL file, optionally gzip-compressed.
+
+    Rows are written as each page arrives, so memory use does not grow with the
+    export; only the keys of written rows are kept, to skip items repeated across
+    pages. CSV gets fixed columns per search type, JSONL the items as returned.
+    write() does blocking file I/O and is meant to run via asyncio.to_thread.
+    """
+
+    def __init__(self, path: str, fmt: str, search_type: str, compress: bool = False) -> None:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"unknown export format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self.duplicates = 0
+        self._columns, self._to_row, self._row_key = row_format(search_type)
+        self._seen = set()
+        if compress:
+            self._file = io.TextIOWrapper(gzip.open(path, 'wb', compresslevel=6), encoding='utf-8', newline='')
+        else:
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._csv = None
+        if fmt == 'csv':
+            self._csv = csv.DictWriter(self._file, fieldnames=self._columns, extrasaction='ignore')
+            self._csv.writeheader()
+
+    def write(self, items: list) -> int:
+        """Append the items not written before; returns how many were new"""
+        written = 0
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            row = self._to_row(item)
+            key = self._row_key(row)
+            if key is not None:
+                if key in self._seen:
+                    self.duplicates += 1
+                    continue
+                self._seen.add(key)
+            if self._csv is not None:
+                self._csv.writerow(row)
+            else:
+                self._file.write(json.dumps(item, ensure_ascii=False))
+                self._file.write("\n")
+            written += 1
+        self.rows += written
+        return written
+
+    def close(self) -> None:
+        self._file.close()
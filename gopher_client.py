@@ -0,0 +1,590 @@
+import asyncio
+import collections
+import heapq
+import itertools
+import json
+import logging
+import random
+import time
+
+import httpx
+
+from logging_setup import log_payload
+from circuit_breaker import CircuitOpenError
+from metrics import COUNT_BUCKETS, REGISTRY
+from result_model import parse_items, records_nbytes
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional 'h2' package (pip install "httpx[http2]")
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Response bodies are decoded once, with orjson when installed (pip install orjson)
+try:
+    import orjson
+    decode_json = orjson.loads
+except ImportError:
+    decode_json = json.loads
+
+# Raw bytes kept from results that are not an item list, for showing as-is
+PREVIEW_BYTES = 1000
+
+# Result status values reported by the legacy status format
+PENDING_STATUSES = ('in_progress', 'pending', 'processing')
+COMPLETED_STATUSES = ('completed', 'success', 'done', 'finished')
+FAILED_STATUSES = ('failed', 'error', 'cancelled')
+
+SEARCH_START_SECONDS = REGISTRY.histogram(
+    "gopher_search_start_seconds", "Latency of POST /search/live"
+)
+SEARCH_RESULT_SECONDS = REGISTRY.histogram(
+    "gopher_search_result_seconds", "Time from starting a search to having its results"
+)
+SEARCH_POLLS = REGISTRY.histogram(
+    "gopher_search_polls", "Result polls made per search", buckets=COUNT_BUCKETS
+)
+HEDGED_POLLS = REGISTRY.counter(
+    "gopher_hedged_polls_total", "Result polls duplicated after the hedge delay, by winner", ("winner",)
+)
+
+
+class GopherSearchError(Exception):
+    """Search failure carrying the message shown to the user"""
+
+    def __init__(self, user_message: str, kind: str) -> None:
+        super().__init__(user_message)
+        self.user_message = user_message
+        self.kind = kind
+
+
+def preview_text(body: bytes, limit: int) -> str:
+    """The first limit bytes of a raw body as text (a cut character is replaced)"""
+    return body[:limit].decode('utf-8', errors='replace')
+
+
+class GopherResult:
+    """Completed search result, decoded once from the response body.
+
+    items is the list of result items (the body itself or its 'data' field), or
+    None if the body holds no list; then preview has the start of the raw body.
+    """
+
+    __slots__ = ('data', 'uuid', 'nbytes', 'items', 'preview')
+
+    def __init__(self, data, uuid: str, body: bytes) -> None:
+        self.data = data
+        self.uuid = uuid
+        self.nbytes = len(body)
+        items = data.get('data') if isinstance(data, dict) else data
+        self.items = items if isinstance(items, list) else None
+        self.preview = preview_text(body, PREVIEW_BYTES) if self.items is None else ""
+
+    def compact(self, search_type: str) -> None:
+        """Replace the decoded items with compact records and drop the rest of the decoded body"""
+        if self.items is None:
+            return
+        self.items = parse_items(search_type, self.items)
+        status = self.data.get('status') if isinstance(self.data, dict) else None
+        self.data = {'status': status} if status is not None else None
+        # What the result now holds, not the size of the response it came from
+        self.nbytes = records_nbytes(self.items)
+
+
+class LatencyTracker:
+    """Recent latencies of one kind of request, for percentile estimates"""
+
+    def __init__(self, size: int = 200) -> None:
+        self._samples = collections.deque(maxlen=size)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PollPolicy:
+    """Result polling schedule: short first probe, jittered exponential backoff, one deadline"""
+
+    def __init__(self, first_delay: float = 0.3, base_delay: float = 0.5, multiplier: float = 2.0,
+                 max_delay: float = 5.0, jitter: float = 0.25, deadline: float = 60.0,
+                 max_request_timeout: float = 15.0, min_request_timeout: float = 1.0) -> None:
+        self.first_delay = first_delay
+        self.base_delay = base_delay
+        self.multiplier = multiplier
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.deadline = deadline
+        self.max_request_timeout = max_request_timeout
+        self.min_request_timeout = min_request_timeout
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before poll number attempt + 1 (attempt counts polls already made)"""
+        if attempt <= 0:
+            return self.first_delay
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return min(delay, self.max_delay)
+
+    def request_timeout(self, remaining: float) -> float:
+        """Per-request timeout, shrunk to whatever is left of the deadline"""
+        return max(self.min_request_timeout, min(self.max_request_timeout, remaining))
+
+    def can_retry(self, remaining: float, delay: float) -> bool:
+        """True if another poll after delay still fits into the remaining budget"""
+        return remaining - delay >= self.min_request_timeout
+
+
+def _error_body(response: httpx.Response) -> str:
+    """Short printable body of a failed response"""
+    return preview_text(response.content, 500)
+
+
+def parse_search_start(response: httpx.Response) -> str:
+    """Validate a /search/live response and return the search UUID"""
+    logger.debug("Search start response status: %s", response.status_code)
+    log_payload(logger, "Search start response", response.content)
+
+    if response.status_code != 200:
+        raise GopherSearchError(
+            f"❌ API ERROR {response.status_code}\n\n"
+            f"Error: {_error_body(response)}",
+            'start_http_status'
+        )
+
+    search_result = decode_json(response.content)
+
+    # Check for error in response
+    if 'error' in search_result and search_result['error']:
+        logger.error("API returned error: %s", search_result['error'])
+        raise GopherSearchError(
+            f"❌ API Error\n\n"
+            f"Error: {search_result['error']}\n\n"
+            f"Please try again or contact support.",
+            'start_error'
+        )
+
+    # Extract UUID
+    if 'uuid' not in search_result:
+        logger.error("No UUID in response: %s", search_result)
+        raise GopherSearchError(
+            f"❌ Invalid API response (no UUID)\n\n"
+            f"Response: {_error_body(response)}",
+            'no_uuid'
+        )
+
+    uuid = search_result['uuid']
+    logger.info("✓ Search UUID received: %s", uuid)
+    return uuid
+
+
+def parse_poll_result(response: httpx.Response, uuid: str, attempt: int, can_retry: bool):
+    """Interpret one /search/live/result response.
+
+    Returns a GopherResult when results are ready, None when the search is still
+    running and another poll is allowed, and raises GopherSearchError otherwise.
+    """
+    logger.debug("Result fetch status: %s", response.status_code)
+    log_payload(logger, "Result fetch response", response.content)
+
+    if response.status_code != 200:
+        if can_retry:
+            logger.warning("Retry %s, status: %s", attempt, response.status_code)
+            return None
+        raise GopherSearchError(
+            f"❌ Failed to get results after {attempt} attempts\n\n"
+            f"Status: {response.status_code}\n"
+            f"Response: {_error_body(response)}",
+            'poll_http_status'
+        )
+
+    body = response.content
+    results = decode_json(body)
+    logger.debug("Results type: %s", type(results).__name__)
+
+    # Case 1: Results is a list (actual data)
+    if isinstance(results, list):
+        if len(results) > 0:
+            logger.info("✓ Results ready, found %s items", len(results))
+            return GopherResult(results, uuid, body)
+        # Empty list means results not ready yet
+        if can_retry:
+            logger.debug("Results not ready yet (empty list), retrying...")
+            return None
+        logger.warning("Results not ready before the search deadline")
+        raise GopherSearchError(
+            f"⚠️ Search is taking longer than expected.\n\n"
+            f"🆔 UUID: {uuid}\n\n"
+            f"The search may still be processing. Please try again in a few moments.",
+            'timeout'
+        )
+
+    # Case 2: Results is a dict (could be error or wrapped data)
+    if isinstance(results, dict):
+        # Check for error
+        if 'error' in results and results['error']:
+            error_detail = results['error']
+            logger.error("Search failed with error: %s", error_detail)
+            raise GopherSearchError(
+                f"❌ Search Failed\n\n"
+                f"Error: {error_detail}\n\n"
+                f"Please try again or use different search parameters.",
+                'result_error'
+            )
+
+        # Check for data field (wrapped response)
+        if 'data' in results:
+            logger.debug("Results wrapped in 'data' field")
+            return GopherResult(results, uuid, body)
+
+        # Check for status field (legacy format)
+        if 'status' in results:
+            status = results.get('status', 'unknown')
+            logger.debug("Result status: %s", status)
+
+            # Normalize status (replace spaces with underscores, lowercase)
+            status_normalized = status.lower().replace(' ', '_')
+
+            if status_normalized in PENDING_STATUSES:
+                if can_retry:
+                    logger.debug("Status '%s' indicates not ready, retrying...", status)
+                    return None
+                logger.warning("Search deadline reached, status still: %s", status)
+                raise GopherSearchError(
+                    f"⚠️ Search timeout\n\n"
+                    f"Status: {status}\n"
+                    f"UUID: {uuid}\n\n"
+                    f"The search is taking longer than expected. Please try again later.",
+                    'timeout'
+                )
+
+            if status_normalized in COMPLETED_STATUSES:
+                logger.info("Results ready (status completed)")
+                return GopherResult(results, uuid, body)
+
+            if status_normalized in FAILED_STATUSES:
+                error_detail = results.get('error', results.get('message', 'Unknown error'))
+                if not error_detail:
+                    error_detail = f"Search status: {status}"
+                logger.error("Search failed: %s", error_detail)
+                raise GopherSearchError(
+                    f"❌ Search failed\n\n"
+                    f"Error: {error_detail}",
+                    'search_failed'
+                )
+
+            # Unknown status - treat as not ready and retry
+            logger.warning("Unknown status '%s', treating as in_progress", status)
+            if can_retry:
+                return None
+            raise GopherSearchError(
+                f"⚠️ Unknown status: {status}\n\n"
+                f"UUID: {uuid}\n\n"
+                f"Please try again later.",
+                'unknown_status'
+            )
+
+        # Unknown dict format, try to display
+        logger.warning("Unknown dict format, displaying as-is")
+        return GopherResult(results, uuid, body)
+
+    # Case 3: Unexpected format
+    logger.error("Unexpected results type: %s", type(results))
+    raise GopherSearchError(
+        f"❌ Unexpected response format\n\n"
+        f"Type: {type(results)}\n"
+        f"Please contact support.",
+        'unexpected_format'
+    )
+
+
+class _PendingPoll:
+    __slots__ = ('uuid', 'policy', 'deadline', 'attempt', 'future', 'on_progress')
+
+    def __init__(self, uuid: str, policy: PollPolicy, deadline: float, future, on_progress) -> None:
+        self.uuid = uuid
+        self.policy = policy
+        self.deadline = deadline
+        self.attempt = 0
+        self.future = future
+        self.on_progress = on_progress
+
+
+class PollScheduler:
+    """One background task that polls every outstanding search UUID.
+
+    Pending searches sit in a heap ordered by their next due time; due polls are
+    issued with at most max_concurrency requests in flight and completions are
+    delivered through the future returned by submit().
+    """
+
+    def __init__(self, client: 'GopherClient', max_concurrency: int = 20) -> None:
+        self._client = client
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks = set()
+        self._runner = None
+
+    def __len__(self) -> int:
+        """Number of outstanding searches"""
+        return len(self._heap) + len(self._tasks)
+
+    def submit(self, uuid: str, policy: PollPolicy, deadline: float, on_progress=None) -> asyncio.Future:
+        """Schedule polling of uuid until done or deadline; returns a future for the GopherResult"""
+        loop = asyncio.get_running_loop()
+        if self._runner is None:
+            self._runner = loop.create_task(self._run())
+        future = loop.create_future()
+        pending = _PendingPoll(uuid, policy, deadline, future, on_progress)
+        self._push(loop.time() + policy.backoff(0), pending)
+        return future
+
+    def _push(self, due: float, pending: _PendingPoll) -> None:
+        heapq.heappush(self._heap, (due, next(self._seq), pending))
+        self._wakeup.set()
+
+    def notify(self, on_progress, uuid: str, attempt: int) -> None:
+        """Run on_progress(uuid, attempt) in the background, logging any failure"""
+        self._spawn(self._report(on_progress, uuid, attempt))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            due = self._heap[0][0]
+            wait = due - loop.time()
+            if wait > 0:
+                # Sleep until the earliest poll is due or an earlier one is submitted
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, pending = heapq.heappop(self._heap)
+            if pending.future.done():
+                # Waiter went away (cancelled), stop polling this UUID
+                continue
+            await self._semaphore.acquire()
+            self._spawn(self._poll(pending))
+
+    async def _poll(self, pending: _PendingPoll) -> None:
+        loop = asyncio.get_running_loop()
+        policy = pending.policy
+        try:
+            pending.attempt += 1
+            logger.debug("Fetching results for %s, attempt %d", pending.uuid, pending.attempt)
+            response = await self._client.fetch_result_hedged(
+                pending.uuid,
+                timeout=policy.request_timeout(pending.deadline - loop.time())
+            )
+
+            # Work out whether another poll still fits into the search deadline
+            delay = policy.backoff(pending.attempt)
+            can_retry = policy.can_retry(pending.deadline - loop.time(), delay)
+
+            result = parse_poll_result(response, pending.uuid, pending.attempt, can_retry)
+            if pending.future.done():
+                return
+            if result is not None:
+                SEARCH_POLLS.observe(pending.attempt)
+                pending.future.set_result(result)
+                return
+
+            self._push(loop.time() + delay, pending)
+            if pending.on_progress is not None:
+                self.notify(pending.on_progress, pending.uuid, pending.attempt)
+        except Exception as e:
+            if not pending.future.done():
+                SEARCH_POLLS.observe(pending.attempt)
+                pending.future.set_exception(e)
+        finally:
+            self._semaphore.release()
+
+    async def _report(self, on_progress, uuid: str, attempt: int) -> None:
+        try:
+            await on_progress(uuid, attempt)
+        except Exception as e:
+            logger.warning("Progress callback for %s failed: %s", uuid, e)
+
+    async def stop(self) -> None:
+        """Cancel the scheduler and fail every outstanding search"""
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for _, _, pending in self._heap:
+            if not pending.future.done():
+                pending.future.cancel()
+        self._heap.clear()
+
+
+class GopherClient:
+    """Async Gopher AI API client sharing one pooled keep-alive HTTP session.
+
+    With a circuit breaker every request is refused (GopherSearchError 'circuit_open')
+    while the API is failing. Result polls are idempotent, so a poll still running after
+    the hedge_percentile latency of recent polls is sent a second time and the first
+    response wins.
+    """
+
+    def __init__(self, base_url: str, token: str, timeout: float = 30.0,
+                 max_connections: int = 100, max_keepalive_connections: int = 20,
+                 poll_concurrency: int = 20, breaker=None, hedge_percentile: float = 0.95,
+                 hedge_min_delay: float = 0.25, hedge_min_samples: int = 20) -> None:
+        self.base_url = base_url.rstrip('/')
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/json"
+            },
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=30.0
+            ),
+            http2=HTTP2_AVAILABLE
+        )
+        self.scheduler = PollScheduler(self, max_concurrency=poll_concurrency)
+        self.breaker = breaker
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.poll_latency = LatencyTracker()
+        logger.info("Gopher client ready (base: %s, http2: %s)", self.base_url, HTTP2_AVAILABLE)
+
+    async def _request(self, method: str, url: str, timeout: float = None, **kwargs) -> httpx.Response:
+        """Send one request through the circuit breaker"""
+        breaker = self.breaker
+        if breaker is not None:
+            try:
+                breaker.before_call()
+            except CircuitOpenError as e:
+                raise GopherSearchError(
+                    f"⚠️ The Gopher API is temporarily unavailable.\n\n"
+                    f"Please try again in about {max(5, round(e.retry_in))} seconds.",
+                    'circuit_open'
+                )
+
+        started = time.monotonic()
+        try:
+            response = await self._client.request(
+                method,
+                url,
+                timeout=httpx.USE_CLIENT_DEFAULT if timeout is None else timeout,
+                **kwargs
+            )
+        except httpx.HTTPError:
+            if breaker is not None:
+                breaker.record(False, time.monotonic() - started)
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
+        if breaker is not None:
+            breaker.record(response.status_code < 500 and response.status_code != 429, time.monotonic() - started)
+        return response
+
+    async def start_search(self, search_data: dict, timeout: float = None) -> httpx.Response:
+        """POST /search/live"""
+        return await self._request("POST", "/search/live", timeout=timeout, json=search_data)
+
+    async def fetch_result(self, uuid: str, timeout: float = None) -> httpx.Response:
+        """GET /search/live/result/{uuid}"""
+        started = time.monotonic()
+        response = await self._request("GET", f"/search/live/result/{uuid}", timeout=timeout)
+        self.poll_latency.observe(time.monotonic() - started)
+        return response
+
+    def hedge_delay(self) -> float:
+        """Seconds after which a result poll is duplicated, or None before enough samples"""
+        if self.hedge_percentile is None or len(self.poll_latency) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.poll_latency.percentile(self.hedge_percentile))
+
+    async def fetch_result_hedged(self, uuid: str, timeout: float = None) -> httpx.Response:
+        """fetch_result, sent again if the first poll is slower than the hedge delay"""
+        delay = self.hedge_delay()
+        if delay is None or (timeout is not None and delay >= timeout):
+            return await self.fetch_result(uuid, timeout)
+
+        first = asyncio.ensure_future(self.fetch_result(uuid, timeout))
+        tasks = {first: "first"}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or (self.breaker is not None and not self.breaker.allows()):
+                return await first
+
+            second = asyncio.ensure_future(self.fetch_result(uuid, None if timeout is None else timeout - delay))
+            tasks[second] = "hedge"
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        HEDGED_POLLS.inc(tasks[task])
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The losing (or abandoned) poll is cancelled
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def search(self, search_data: dict, policy: PollPolicy, on_progress=None) -> GopherResult:
+        """Start a search and poll until results are ready or the deadline passes.
+
+        on_progress(uuid, attempt) runs in the background once the search is started
+        (attempt 0) and after every poll that found the results not ready yet.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + policy.deadline
+
+        log_payload(logger, "Request data", search_data)
+
+        with SEARCH_START_SECONDS.time():
+            response = await self.start_search(
+                search_data,
+                timeout=policy.request_timeout(deadline - loop.time())
+            )
+        uuid = parse_search_start(response)
+        if on_progress is not None:
+            self.scheduler.notify(on_progress, uuid, 0)
+
+        # Hand the UUID to the shared poll scheduler and wait for the outcome
+        result = await self.scheduler.submit(uuid, policy, deadline, on_progress=on_progress)
+        SEARCH_RESULT_SECONDS.observe(loop.time() - started)
+        return result
+
+    async def aclose(self) -> None:
+        """Stop the poll scheduler and close the pooled HTTP session"""
+        await self.scheduler.stop()
+        await self._client.aclose()
@@ -0,0 +1,88 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+
+# Payload logging is off by default; when enabled only a sample of payloads is logged, truncated
+LOG_PAYLOADS = os.environ.get("LOG_PAYLOADS", "0").lower() in ("1", "true", "yes")
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", "0.1"))
+LOG_PAYLOAD_MAX_CHARS = int(os.environ.get("LOG_PAYLOAD_MAX_CHARS", "500"))
+# Loggers that call log_payload(); only these are lowered to DEBUG when payload logging is on
+PAYLOAD_LOGGERS = ('gopher_client',)
+
+_listener = None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class PayloadPreview:
+    """Lazily formatted, truncated view of a payload (str, bytes or JSON-like object)"""
+
+    __slots__ = ('payload', 'limit')
+
+    def __init__(self, payload, limit: int = LOG_PAYLOAD_MAX_CHARS) -> None:
+        self.payload = payload
+        self.limit = limit
+
+    def __str__(self) -> str:
+        payload = self.payload
+        if isinstance(payload, (bytes, bytearray)):
+            # Slice the raw body before decoding so large responses are never decoded whole
+            text = bytes(payload[:self.limit * 4]).decode('utf-8', errors='replace')
+            size = len(payload)
+        else:
+            text = payload if isinstance(payload, str) else repr(payload)
+            size = len(text)
+        if len(text) > self.limit:
+            return f"{text[:self.limit]}... ({size} total)"
+        return text
+
+
+def log_payload(logger: logging.Logger, label: str, payload) -> None:
+    """Log a sampled, truncated payload at DEBUG if payload logging is enabled"""
+    if not LOG_PAYLOADS or random.random() >= LOG_PAYLOAD_SAMPLE_RATE:
+        return
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s: %s", label, PayloadPreview(payload))
+
+
+def setup_logging(log_file: str = None, level: int = logging.INFO) -> None:
+    """Route all logging through a queue to a background thread writing a rotating file"""
+    global _listener
+    if _listener is not None:
+        return
+
+    log_file = log_file or os.environ.get("LOG_FILE", "bot.log")
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file,
+        maxBytes=int(os.environ.get("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        backupCount=int(os.environ.get("LOG_BACKUP_COUNT", "5")),
+        encoding="utf-8"
+    )
+    file_handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    if LOG_PAYLOADS:
+        # Not the root logger: that would also turn on every library's debug output
+        for name in PAYLOAD_LOGGERS:
+            logging.getLogger(name).setLevel(logging.DEBUG)
+
+    _listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -1,19 +1,40 @@
+import asyncio
 import logging
 import os
 import json
-import requests
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
-
-# Enable logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('bot.log')
-    ]
+import re
+import secrets
+import socket
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+import httpx
+from telegram import (
+    Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent
+)
+from telegram.error import BadRequest
+from telegram.ext import (
+    Application, CommandHandler, MessageHandler, CallbackQueryHandler, InlineQueryHandler, filters, ContextTypes
 )
+
+from logging_setup import setup_logging
+from gopher_client import GopherClient, GopherSearchError, PollPolicy
+from result_cache import ResultCache, SingleFlight, make_cache_key
+from session_store import create_session_store
+from work_queue import SQLiteWorkQueue
+from result_archive import ResultArchive
+from watcher import WatchManager
+from exporter import EXPORT_FORMATS, ExportWriter, next_cursor
+from result_model import TweetRecord, record_from_row
+from renderer import RULE, SEPARATOR, fit_blocks, pack_chunks, render_items, split_text
+from outbound import OutboundScheduler, ProgressTracker, PRIORITY_NORMAL, PRIORITY_RESULT
+from metrics import REGISTRY, start_metrics_server
+from admission import AdmissionController
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+# Enable logging (queued to a background thread, rotating bot.log)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # Set httpx and telegram logging to WARNING to reduce noise
@@ -25,14 +46,197 @@ BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "YOU TELEGRAM TOKEN HERE")
 
 # Gopher AI API Configuration
 GOPHER_API_TOKEN = os.environ.get("GOPHER_API_TOKEN", "YOU GOPHER API TOKEN HERE")
-GOPHER_API_BASE = "https://data.gopher-ai.com/api/v1"
+GOPHER_API_BASE = os.environ.get("GOPHER_API_BASE", "https://data.gopher-ai.com/api/v1")
+
+# Telegram Bot API endpoint (the token is appended); point at a local fake for benchmarks
+TELEGRAM_API_BASE = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org/bot")
+
+# Update delivery: 'polling' (default) or 'webhook' served by the built-in webhook server
+BOT_MODE = os.environ.get("BOT_MODE", "polling")
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "telegram")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+# Public URL registered with Telegram (e.g. https://bot.example.com/telegram); required in webhook mode
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "")
+
+# Process role: 'standalone' (default) does everything; 'frontend' talks to Telegram and hands
+# /search queries to workers ('worker' runs them) through WORK_QUEUE_PATH. /multisearch, /watch,
+# /export and inline queries still run their searches in the front-end.
+BOT_ROLE = os.environ.get("BOT_ROLE", "standalone")
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "50"))
+work_queue = None
+if BOT_ROLE in ("frontend", "worker"):
+    work_queue = SQLiteWorkQueue(os.environ.get("WORK_QUEUE_PATH", "jobs.db"))
+
+# Result polling: short first probe, jittered backoff, hard end-to-end deadline (seconds)
+POLL_POLICY = PollPolicy(deadline=float(os.environ.get("GOPHER_SEARCH_DEADLINE", "60")))
+
+# Stop calling the Gopher API while it fails or is slow; half-open probes after the reset timeout
+gopher_breaker = CircuitBreaker(
+    window=int(os.environ.get("GOPHER_BREAKER_WINDOW", "20")),
+    failure_rate=float(os.environ.get("GOPHER_BREAKER_FAILURE_RATE", "0.5")),
+    slow_call_seconds=float(os.environ.get("GOPHER_BREAKER_SLOW_CALL", "10")),
+    reset_timeout=float(os.environ.get("GOPHER_BREAKER_RESET", "30")),
+    name="gopher"
+)
+
+# Failures after which an expired cached result is better than nothing
+STALE_FALLBACK_KINDS = ('circuit_open', 'start_http_status', 'poll_http_status', 'timeout', 'unknown_status')
+
+# Completed results shared across users, keyed on the normalized search arguments
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+)
+
+# Identical searches running right now, so concurrent callers share one upstream search
+inflight_searches = SingleFlight()
+
+# Upstream search slots: global and per-user limits, fair queueing in fast/normal/slow lanes
+admission = AdmissionController(
+    max_concurrent=int(os.environ.get("SEARCH_MAX_CONCURRENT", "20")),
+    per_user=int(os.environ.get("SEARCH_PER_USER_CONCURRENCY", "2")),
+    max_queued_per_user=int(os.environ.get("SEARCH_PER_USER_QUEUE", "10")),
+    slow_limit=int(os.environ.get("SEARCH_SLOW_LANE_LIMIT", "5")),
+    background_limit=int(os.environ.get("SEARCH_BACKGROUND_LIMIT", "5"))
+)
+
+# Every outbound Telegram call goes through one rate-limited, prioritised queue. The limits are
+# per bot token: processes sending with the same token (front-end and each worker) split them evenly
+TELEGRAM_PROCESSES = int(os.environ.get("TELEGRAM_PROCESSES", "1"))
+outbound = OutboundScheduler(
+    global_rate=float(os.environ.get("TELEGRAM_GLOBAL_RATE", "30")),
+    chat_rate=float(os.environ.get("TELEGRAM_CHAT_RATE", "1")),
+    share=1 / max(1, TELEGRAM_PROCESSES)
+)
+
+# Paginated results kept server-side; shared through SQLite when workers run separately
+SEARCH_MAX_RESULTS = int(os.environ.get("SEARCH_MAX_RESULTS", "100"))
+RESULTS_PER_PAGE = int(os.environ.get("RESULTS_PER_PAGE", "5"))
 
-# Store user search state
-search_states = {}
+# Inline mode (@bot query): answered from the result cache; uncached queries wait until typing settles
+INLINE_DEBOUNCE = float(os.environ.get("INLINE_DEBOUNCE", "0.7"))
+INLINE_MIN_QUERY = int(os.environ.get("INLINE_MIN_QUERY", "3"))
+INLINE_PAGE_SIZE = int(os.environ.get("INLINE_PAGE_SIZE", "20"))
+INLINE_CACHE_TIME = int(os.environ.get("INLINE_CACHE_TIME", "300"))
+# Telegram rejects answers that come too late; slower searches are answered empty and finish in the background
+INLINE_ANSWER_TIMEOUT = float(os.environ.get("INLINE_ANSWER_TIMEOUT", "5"))
+INLINE_RETRY_CACHE_TIME = 5
+# Each user's pending inline lookup, cancelled when a newer keystroke arrives
+inline_lookups = {}
+
+# /multisearch: up to MULTISEARCH_MAX_QUERIES queries, at most MULTISEARCH_CONCURRENCY at a time
+MULTISEARCH_MAX_QUERIES = int(os.environ.get("MULTISEARCH_MAX_QUERIES", "50"))
+MULTISEARCH_CONCURRENCY = int(os.environ.get("MULTISEARCH_CONCURRENCY", "5"))
+result_pages = create_session_store(
+    backend="sqlite" if work_queue is not None else "memory",
+    path=os.environ.get("WORK_QUEUE_PATH", "jobs.db"),
+    ttl=float(os.environ.get("RESULT_PAGES_TTL", "3600")),
+    max_size=int(os.environ.get("RESULT_PAGES_MAX", "5000")),
+    table="result_pages",
+    # Result records are stored as JSON rows when pages are shared through SQLite
+    encode=lambda entry: {**entry, 'items': [record.to_row() for record in entry['items']]},
+    decode=lambda entry: {**entry, 'items': [record_from_row(row) for row in entry['items']]}
+)
+
+# Every fetched item is archived to SQLite (FTS5) for /history and /find; empty path disables
+ARCHIVE_PATH = os.environ.get("ARCHIVE_PATH", "archive.db")
+HISTORY_LIMIT = int(os.environ.get("HISTORY_LIMIT", "10"))
+archive = ResultArchive(ARCHIVE_PATH) if ARCHIVE_PATH else None
+
+# /watch subscriptions, refreshed once per distinct query; interval adapts within [min, max] seconds
+WATCH_DB_PATH = os.environ.get("WATCH_DB_PATH", "watches.db")
+WATCH_INTERVAL = float(os.environ.get("WATCH_INTERVAL", "300"))
+WATCH_MIN_INTERVAL = float(os.environ.get("WATCH_MIN_INTERVAL", "120"))
+WATCH_MAX_INTERVAL = float(os.environ.get("WATCH_MAX_INTERVAL", "3600"))
+WATCH_MAX_PER_USER = int(os.environ.get("WATCH_MAX_PER_USER", "10"))
+# Created in post_init (needs the bot to deliver new results)
+watches = None
+
+# /export: pages of EXPORT_PAGE_SIZE written to a temporary file in EXPORT_DIR, up to EXPORT_MAX_ROWS rows
+EXPORT_PAGE_SIZE = int(os.environ.get("EXPORT_PAGE_SIZE", "100"))
+EXPORT_MAX_ROWS = int(os.environ.get("EXPORT_MAX_ROWS", "10000"))
+EXPORT_DIR = os.environ.get("EXPORT_DIR") or None
+# Bots may upload documents of at most 50 MB
+EXPORT_MAX_BYTES = 50 * 1024 * 1024
+EXPORT_ALIASES = {
+    'followers': 'getfollowers',
+    'following': 'getfollowing',
+    'retweeters': 'getretweeters',
+    'tweets': 'searchbyquery',
+}
+EXPORT_SEARCH_TYPES = (
+    'getfollowers', 'getfollowing', 'getretweeters', 'searchbyquery', 'searchbyfullarchive',
+    'getreplies', 'gettweets', 'getmedia'
+)
+
+# Strong references to fire-and-forget tasks so they are not garbage collected
+background_tasks = set()
+
+# Shared Gopher API client, created in post_init and closed in post_shutdown
+gopher_client = None
+
+# Store user search state (expiring, bounded; 'memory' or persistent 'sqlite' backend)
+search_states = create_session_store(
+    backend=os.environ.get("SESSION_BACKEND", "memory"),
+    path=os.environ.get("SESSION_DB_PATH", "sessions.db"),
+    ttl=float(os.environ.get("SESSION_TTL", "900")),
+    max_size=int(os.environ.get("SESSION_MAX_SIZE", "10000"))
+)
+SESSION_SWEEP_INTERVAL = float(os.environ.get("SESSION_SWEEP_INTERVAL", "60"))
+
+# Prometheus metrics served at http://METRICS_HOST:METRICS_PORT/metrics (port 0 disables)
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+metrics_server = None
+SEARCH_FAILURES = REGISTRY.counter(
+    "gopher_search_failures_total", "Failed searches by failure kind", ("kind",)
+)
+RENDER_SECONDS = REGISTRY.histogram(
+    "render_seconds", "Time to render search results into message text"
+)
+REGISTRY.gauge("search_sessions_active", "Users in the middle of a /search", lambda: len(search_states))
+REGISTRY.gauge("searches_inflight", "Distinct upstream searches running", lambda: len(inflight_searches))
+REGISTRY.gauge("telegram_outbound_queue_depth", "Telegram calls waiting to be sent", outbound.depth)
+REGISTRY.gauge("search_admission_running", "Upstream searches holding a slot", admission.running)
+REGISTRY.gauge("search_admission_queued", "Searches waiting for a slot", admission.queued)
+REGISTRY.gauge("watched_queries", "Distinct /watch queries refreshed", lambda: len(watches) if watches else 0)
+REGISTRY.gauge(
+    "gopher_circuit_state", "Gopher API circuit: 0 closed, 1 half-open, 2 open",
+    lambda: {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}[gopher_breaker.state]
+)
+STALE_FALLBACKS = REGISTRY.counter(
+    "search_stale_fallbacks_total", "Searches answered from expired cache entries because the API failed"
+)
+
+async def send_reply(update: Update, text: str, priority: int = PRIORITY_NORMAL, **kwargs):
+    """Reply to the update's message through the outbound queue"""
+    message = update.message
+    return await outbound.send(
+        message.chat_id,
+        lambda: message.reply_text(text, **kwargs),
+        priority
+    )
+
+async def send_edit(query, text: str, priority: int = PRIORITY_NORMAL, **kwargs):
+    """Edit a callback query's message through the outbound queue"""
+    return await outbound.send(
+        query.message.chat_id,
+        lambda: query.edit_message_text(text, **kwargs),
+        priority
+    )
+
+async def store_call(method, *args):
+    """Call a session store method, in a worker thread if the store does disk I/O"""
+    if method.__self__.blocking:
+        return await asyncio.to_thread(method, *args)
+    return method(*args)
 
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handler for /start command"""
-    await update.message.reply_text(
+    await send_reply(
+        update,
         "🔍 Welcome to Gopher Explore Bot! 🔍\n\n"
         "Your AI-powered companion for exploring digital content across platforms.\n\n"
         "I can analyze:\n"
@@ -43,7 +247,7 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         "💬 Reddit posts and discussions\n\n"
         "⚡ Powered by Gopher AI\n"
         "📊 https://data.gopher-ai.com\n\n"
-        "🛠️ Commands: /start • /help • /info • /search\n\n"
+        "🛠️ Commands: /start • /help • /info • /search • /multisearch • /history • /find • /watch • /export\n\n"
         "💡 Simply send me usernames, keywords, or URLs to begin exploring!\n\n"
         "🚀 Your digital discovery journey starts here!"
     )
@@ -62,7 +266,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "✅ Basic text formatting\n\n"
         "This is a basic template that can be further developed."
     )
-    await update.message.reply_text(help_text, parse_mode='Markdown')
+    await send_reply(update, help_text, parse_mode='Markdown')
 
 async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handler for /info command"""
@@ -82,20 +286,21 @@ async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
 
 **Bot Info:**
 • Status: 🟢 Online
+• Outbound queue: {outbound.depth()}
 • Version: 1.0.0
 • Framework: python-telegram-bot
     """
-    await update.message.reply_text(chat_info, parse_mode='Markdown')
+    await send_reply(update, chat_info, parse_mode='Markdown')
 
 async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handler for /search command"""
     user_id = update.effective_user.id
     
     # Store search state for this user
-    search_states[user_id] = {
+    await store_call(search_states.set, user_id, {
         'step': 'type_selection',
         'platform': 'twitter'
-    }
+    })
     
     # Create inline keyboard with search type options
     keyboard = [
@@ -117,7 +322,8 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await update.message.reply_text(
+    await send_reply(
+        update,
         "🔍 Choose search type:\n\n"
         "Select one of the options below:",
         reply_markup=reply_markup
@@ -131,24 +337,27 @@ async def search_type_button_callback(update: Update, context: ContextTypes.DEFA
     user_id = query.from_user.id
     search_type = query.data
     
-    logger.info(f"User {user_id} selected search type: {search_type}")
+    logger.info("User %s selected search type: %s", user_id, search_type)
     
     # Check if user has an active search state
-    if user_id not in search_states:
-        logger.warning(f"User {user_id} has no active search state")
-        await query.edit_message_text("❌ Search session expired. Please use /search to start again.")
+    state = await store_call(search_states.get, user_id)
+    if state is None:
+        logger.warning("User %s has no active search state", user_id)
+        await send_edit(query, "❌ Search session expired. Please use /search to start again.")
         return
     
     # Update search state
-    search_states[user_id]['search_type'] = search_type
-    search_states[user_id]['step'] = 'query_input'
+    state['search_type'] = search_type
+    state['step'] = 'query_input'
+    await store_call(search_states.set, user_id, state)
     
-    logger.info(f"User {user_id} state updated: {search_states[user_id]}")
+    logger.debug("User %s state updated: %s", user_id, state)
     
     # Show query input prompt
     examples = "Examples: 'from:gopher_ai', 'python tutorial', '#web3', 'Elon Musk'"
     
-    await query.edit_message_text(
+    await send_edit(
+        query,
         f"✅ Search type set to: {search_type}\n\n"
         f"💬 What do you want to search for?\n\n"
         f"{examples}\n\n"
@@ -160,949 +369,974 @@ async def handle_search_step(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user_id = update.effective_user.id
     user_message = update.message.text.strip()
     
-    logger.info(f"User {user_id} sent message: {user_message[:100]}")
+    logger.debug("User %s sent message: %.100s", user_id, user_message)
     
     # Check if user is in search process
-    if user_id not in search_states:
-        logger.info(f"User {user_id} not in search state, ignoring")
+    state = await store_call(search_states.get, user_id)
+    if state is None:
+        logger.debug("User %s not in search state, ignoring", user_id)
         return
     
-    state = search_states[user_id]
-    logger.info(f"User {user_id} current state: {state}")
+    logger.debug("User %s current state: %s", user_id, state)
     
     # Handle query input
     if state['step'] == 'query_input':
-        # Store query and execute search
+        # The session ends once the query is in: the search (or its queued job) carries the
+        # state from here, so a search finishing later never clears a session started since
         state['query'] = user_message
-        state['step'] = 'searching'
+        await store_call(search_states.delete, user_id)
+        
+        logger.info("User %s starting search with query: %s", user_id, user_message[:100])
         
-        logger.info(f"User {user_id} starting search with query: {user_message}")
+        # One status message per search, edited as the search progresses
+        progress = ProgressTracker(outbound, update.message)
+        await progress.start("🔄 Starting search... Please wait a moment.")
         
-        await update.message.reply_text("🔄 Starting search... Please wait a moment.")
+        # Hand the search to a worker process when running split
+        if work_queue is not None:
+            job_id = await asyncio.to_thread(
+                work_queue.enqueue,
+                {'update': update.to_json(), 'state': state, 'status_message_id': progress.message_id}
+            )
+            logger.info("Queued search job %s for user %s", job_id, user_id)
+            return
         
         # Execute search
-        await execute_gopher_search(update, state)
+        await execute_gopher_search(update, state, progress)
+    
+    elif state['step'] == 'multi_query_input':
+        await store_call(search_states.delete, user_id)
+        queries = parse_multisearch_queries(user_message)
+        if not queries:
+            await send_reply(update, "❌ No queries found. Please use /multisearch to start again.")
+            return
+        await execute_multisearch(update, queries)
 
-async def execute_gopher_search(update: Update, state: dict) -> None:
-    """Execute search using Gopher AI API"""
-    import time
-    import asyncio
+def build_search_data(state: dict) -> dict:
+    """Gopher /search/live request body for a search session"""
+    return {
+        "type": state['platform'],
+        "arguments": {
+            "type": state['search_type'],
+            "query": state['query'],
+            "max_results": SEARCH_MAX_RESULTS
+        }
+    }
+
+async def fetch_search_results(search_data: dict, user_id=None, on_progress=None, on_upstream=None,
+                               on_queued=None):
+    """Results for search_data from the result cache or one shared upstream search.
+
+    Returns (result, from_cache, stale_age) with result a GopherResult. on_upstream(joined) is called before waiting
+    on the upstream search, with joined=True if an identical search was already running.
+    New upstream searches first wait for an admission slot for user_id, reporting
+    their queue position to on_queued(position). stale_age is the age in seconds of
+    cached results served because the Gopher API is unavailable, otherwise None.
+    """
+    cache_key = make_cache_key(search_data)
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        result, is_stale = cached
+        logger.info("Cache %shit: %s", 'stale ' if is_stale else '', cache_key)
+        if is_stale and result_cache.begin_refresh(cache_key):
+            task = asyncio.create_task(refresh_cached_search(cache_key, search_data))
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+        stale_age = None
+        if is_stale and gopher_breaker.state != CLOSED:
+            stale_age = result_cache.get_fallback(cache_key)[1]
+        return result, True, stale_age
     
+    joined = cache_key in inflight_searches
+    if on_upstream is not None:
+        on_upstream(joined)
+    try:
+        result = await run_shared_search(cache_key, search_data, on_progress=on_progress,
+                                         user_id=user_id, on_queued=on_queued)
+    except (GopherSearchError, httpx.HTTPError) as e:
+        if isinstance(e, GopherSearchError) and e.kind not in STALE_FALLBACK_KINDS:
+            raise
+        fallback = result_cache.get_fallback(cache_key)
+        if fallback is None:
+            raise
+        result, stale_age = fallback
+        logger.warning("Serving %.0fs old results for %s, search failed: %s", stale_age, cache_key, e)
+        STALE_FALLBACKS.inc()
+        return result, True, stale_age
+    return result, False, None
+
+def stale_notice(stale_age: float) -> str:
+    """Header line marking results served from an expired cache entry"""
+    minutes = max(1, round(stale_age / 60))
+    return (
+        f"⚠️ STALE RESULTS: the Gopher API is unavailable right now, "
+        f"showing results from {minutes} min ago.\n\n"
+    )
+
+def describe_search_error(e: Exception) -> str:
+    """Log and count a failed search; returns the message shown to the user"""
+    if isinstance(e, GopherSearchError):
+        SEARCH_FAILURES.inc(e.kind)
+        return e.user_message
+    
+    if isinstance(e, httpx.TimeoutException):
+        SEARCH_FAILURES.inc("request_timeout")
+        logger.error("Request timeout")
+        return "❌ Request timeout. API took too long to respond."
+    
+    if isinstance(e, httpx.HTTPError):
+        SEARCH_FAILURES.inc("network_error")
+        logger.error("Request error: %s", e)
+        return f"❌ Network error: {str(e)}"
+    
+    SEARCH_FAILURES.inc("unexpected")
+    logger.error("Unexpected error: %s", e, exc_info=e)
+    return (
+        f"❌ Unexpected error: {str(e)}\n\n"
+        f"Please try again or contact support."
+    )
+
+async def execute_gopher_search(update: Update, state: dict, progress: ProgressTracker = None) -> None:
+    """Execute search using Gopher AI API"""
     user_id = update.effective_user.id
+    if progress is None:
+        progress = ProgressTracker(outbound, update.message)
     
     try:
-        # First request - start search
-        search_data = {
-            "type": state['platform'],
-            "arguments": {
-                "type": state['search_type'],
-                "query": state['query'],
-                "max_results": 5
-            }
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {GOPHER_API_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
-        logger.info(f"Starting search for user {user_id}")
-        logger.info(f"Request URL: {GOPHER_API_BASE}/search/live")
-        logger.info(f"Request data: {json.dumps(search_data, indent=2)}")
-        
-        # Start search
-        response = requests.post(
-            f"{GOPHER_API_BASE}/search/live",
-            headers=headers,
-            json=search_data,
-            timeout=30
-        )
-        
-        logger.info(f"Search start response status: {response.status_code}")
-        logger.info(f"Search start response: {response.text}")
-        
-        if response.status_code != 200:
-            error_msg = f"❌ API ERROR {response.status_code}\n\n"
-            try:
-                error_data = response.json()
-                error_msg += f"Error: {json.dumps(error_data, indent=2)}"
-            except:
-                error_msg += f"Response: {response.text[:500]}"
-            
-            await update.message.reply_text(error_msg)
-            del search_states[user_id]
-            return
-        
-        search_result = response.json()
-        logger.info(f"Search result response: {json.dumps(search_result, indent=2)}")
+        def announce_upstream(joined: bool) -> None:
+            if joined:
+                logger.info("User %s joined in-flight search", user_id)
+                progress.update("⏳ The same search is already running, you'll get its results shortly...")
+            else:
+                logger.info("Starting search for user %s", user_id)
         
-        # Check for error in response
-        if 'error' in search_result and search_result['error']:
-            logger.error(f"API returned error: {search_result['error']}")
-            await update.message.reply_text(
-                f"❌ API Error\n\n"
-                f"Error: {search_result['error']}\n\n"
-                f"Please try again or contact support."
-            )
-            del search_states[user_id]
-            return
+        async def report_progress(uuid: str, attempt: int) -> None:
+            if attempt == 0:
+                progress.update(
+                    f"⏳ Search initiated successfully!\n\n"
+                    f"🆔 Search ID: {uuid[:8]}...\n\n"
+                    f"Fetching results..."
+                )
+            else:
+                progress.update(
+                    f"⏳ Processing... (check {attempt})\n\n"
+                    f"🆔 Search ID: {uuid[:8]}..."
+                )
         
-        # Extract UUID
-        if 'uuid' not in search_result:
-            logger.error(f"No UUID in response: {search_result}")
-            await update.message.reply_text(
-                f"❌ Invalid API response (no UUID)\n\n"
-                f"Response: {json.dumps(search_result, indent=2)[:500]}"
+        def report_queue_position(position: int) -> None:
+            progress.update(
+                f"⏳ Many searches are running right now.\n\n"
+                f"👥 Your place in the queue: {position}"
             )
-            del search_states[user_id]
-            return
         
-        uuid = search_result['uuid']
-        logger.info(f"✓ Search UUID received: {uuid}")
-        await update.message.reply_text(
-            f"⏳ Search initiated successfully!\n\n"
-            f"🆔 Search ID: {uuid[:8]}...\n\n"
-            f"Fetching results..."
+        result, from_cache, stale_age = await fetch_search_results(
+            build_search_data(state),
+            user_id=user_id,
+            on_progress=report_progress,
+            on_upstream=announce_upstream,
+            on_queued=report_queue_position
         )
-        
-        # Poll for results with retry logic
-        max_retries = 10
-        retry_delay = 2  # seconds
-        
-        for attempt in range(max_retries):
-            logger.info(f"Fetching results, attempt {attempt + 1}/{max_retries}")
-            
-            result_url = f"{GOPHER_API_BASE}/search/live/result/{uuid}"
-            logger.info(f"Requesting endpoint 2: {result_url}")
-            logger.info(f"Using UUID: {uuid}")
-            
-            result_response = requests.get(
-                result_url,
-                headers=headers,
-                timeout=30
+        if archive is not None:
+            archive.record_search(
+                user_id, state['platform'], state['search_type'], state['query'],
+                len(result.items or [])
             )
-            
-            logger.info(f"Result fetch status: {result_response.status_code}")
-            logger.info(f"Result fetch response: {result_response.text[:500]}")
-            
-            if result_response.status_code != 200:
-                if attempt < max_retries - 1:
-                    logger.warning(f"Retry {attempt + 1}, status: {result_response.status_code}")
-                    await asyncio.sleep(retry_delay)
-                    continue
-                else:
-                    error_msg = f"❌ Failed to get results after {max_retries} attempts\n\n"
-                    error_msg += f"Status: {result_response.status_code}\n"
-                    try:
-                        error_data = result_response.json()
-                        error_msg += f"Response: {json.dumps(error_data, indent=2)[:500]}"
-                    except:
-                        error_msg += f"Response: {result_response.text[:500]}"
-                    
-                    await update.message.reply_text(error_msg)
-                    del search_states[user_id]
-                    return
-            
-            results = result_response.json()
-            logger.info(f"Results type: {type(results)}, length: {len(results) if isinstance(results, (list, dict)) else 'N/A'}")
-            
-            # Case 1: Results is a list (actual data)
-            if isinstance(results, list):
-                if len(results) > 0:
-                    # Results ready!
-                    logger.info(f"✓ Results ready, found {len(results)} items")
-                    await display_search_results(update, state, results)
-                    break
-                else:
-                    # Empty list means results not ready yet
-                    if attempt < max_retries - 1:
-                        logger.info("Results not ready yet (empty list), retrying...")
-                        await update.message.reply_text(f"⏳ Processing... ({attempt + 1}/{max_retries})")
-                        await asyncio.sleep(retry_delay)
-                        continue
-                    else:
-                        logger.warning("Results not ready after max retries")
-                        await update.message.reply_text(
-                            f"⚠️ Search is taking longer than expected.\n\n"
-                            f"🆔 UUID: {uuid}\n\n"
-                            f"The search may still be processing. Please try again in a few moments."
-                        )
-                        del search_states[user_id]
-                        return
-            
-            # Case 2: Results is a dict (could be error or wrapped data)
-            elif isinstance(results, dict):
-                # Check for error
-                if 'error' in results and results['error']:
-                    error_detail = results['error']
-                    logger.error(f"Search failed with error: {error_detail}")
-                    await update.message.reply_text(
-                        f"❌ Search Failed\n\n"
-                        f"Error: {error_detail}\n\n"
-                        f"Please try again or use different search parameters."
-                    )
-                    del search_states[user_id]
-                    return
-                
-                # Check for data field (wrapped response)
-                elif 'data' in results:
-                    logger.info("Results wrapped in 'data' field")
-                    await display_search_results(update, state, results)
-                    break
-                
-                # Check for status field (legacy format)
-                elif 'status' in results:
-                    status = results.get('status', 'unknown')
-                    logger.info(f"Result status: {status}")
-                    
-                    # Normalize status (replace spaces with underscores, lowercase)
-                    status_normalized = status.lower().replace(' ', '_')
-                    
-                    if status_normalized in ['in_progress', 'pending', 'processing']:
-                        if attempt < max_retries - 1:
-                            logger.info(f"Status '{status}' indicates not ready, retrying...")
-                            await update.message.reply_text(f"⏳ Processing... ({attempt + 1}/{max_retries})")
-                            await asyncio.sleep(retry_delay)
-                            continue
-                        else:
-                            logger.warning(f"Max retries reached, status still: {status}")
-                            await update.message.reply_text(
-                                f"⚠️ Search timeout\n\n"
-                                f"Status: {status}\n"
-                                f"UUID: {uuid}\n\n"
-                                f"The search is taking longer than expected. Please try again later."
-                            )
-                            del search_states[user_id]
-                            return
-                    
-                    elif status_normalized in ['completed', 'success', 'done', 'finished']:
-                        logger.info("Results ready (status completed)")
-                        await display_search_results(update, state, results)
-                        break
-                    
-                    elif status_normalized in ['failed', 'error', 'cancelled']:
-                        error_detail = results.get('error', results.get('message', 'Unknown error'))
-                        if not error_detail or error_detail == "":
-                            error_detail = f"Search status: {status}"
-                        logger.error(f"Search failed: {error_detail}")
-                        await update.message.reply_text(
-                            f"❌ Search failed\n\n"
-                            f"Error: {error_detail}"
-                        )
-                        del search_states[user_id]
-                        return
-                    
-                    else:
-                        # Unknown status - treat as not ready and retry
-                        logger.warning(f"Unknown status '{status}', treating as in_progress")
-                        if attempt < max_retries - 1:
-                            await update.message.reply_text(f"⏳ Processing... ({attempt + 1}/{max_retries})")
-                            await asyncio.sleep(retry_delay)
-                            continue
-                        else:
-                            await update.message.reply_text(
-                                f"⚠️ Unknown status: {status}\n\n"
-                                f"UUID: {uuid}\n\n"
-                                f"Please try again later."
-                            )
-                            del search_states[user_id]
-                            return
-                
-                # Unknown dict format, try to display
-                else:
-                    logger.warning(f"Unknown dict format, displaying as-is")
-                    await display_search_results(update, state, results)
-                    break
-            
-            # Case 3: Unexpected format
-            else:
-                logger.error(f"Unexpected results type: {type(results)}")
-                await update.message.reply_text(
-                    f"❌ Unexpected response format\n\n"
-                    f"Type: {type(results)}\n"
-                    f"Please contact support."
-                )
-                del search_states[user_id]
-                return
-        
-        # Clean up state
-        if user_id in search_states:
-            del search_states[user_id]
-        
-    except requests.exceptions.Timeout:
-        logger.error("Request timeout")
-        await update.message.reply_text("❌ Request timeout. API took too long to respond.")
-        if user_id in search_states:
-            del search_states[user_id]
-    
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error: {str(e)}")
-        await update.message.reply_text(f"❌ Network error: {str(e)}")
-        if user_id in search_states:
-            del search_states[user_id]
+        if not from_cache:
+            progress.update("📊 Rendering results...")
+        await display_search_results(
+            update, state, result, progress,
+            notice=stale_notice(stale_age) if stale_age is not None else ""
+        )
     
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
-        await update.message.reply_text(
-            f"❌ Unexpected error: {str(e)}\n\n"
-            f"Please try again or contact support."
-        )
-        if user_id in search_states:
-            del search_states[user_id]
+        await progress.finish(describe_search_error(e))
 
-async def display_search_results(update: Update, state: dict, results) -> None:
-    """Display search results"""
-    logger.info(f"Displaying results type: {type(results)}")
-    logger.info(f"Results preview: {json.dumps(results, indent=2)[:1000] if not isinstance(results, str) else results[:1000]}")
-    
-    result_text = (
-        f"✅ SEARCH COMPLETED\n\n"
-        f"🎯 Type: {state['search_type']}\n"
-        f"📝 Query: {state['query']}\n"
-        f"🌐 Platform: {state['platform']}\n\n"
-    )
+async def run_shared_search(cache_key: tuple, search_data: dict, on_progress=None, user_id=None,
+                            on_queued=None, background: bool = False):
+    """Run one upstream search per distinct key; concurrent identical callers share it.
+
+    The shared search waits for its admission slot (charged to the first caller's
+    user_id) after it is registered, so identical searches arriving while it is still
+    queued join it instead of queueing searches of their own.
+    """
+    arguments = search_data['arguments']
     
-    # Handle results based on type
-    data_list = None
+    async def search_and_cache():
+        async with admission.admit(user_id, arguments['type'], on_queued, background=background):
+            result = await gopher_client.search(search_data, POLL_POLICY, on_progress=on_progress)
+        if archive is not None:
+            archive.archive_items(search_data['type'], arguments['type'], arguments['query'], result.items or [])
+        # Cached and paged results keep compact records, not the decoded JSON
+        result.compact(arguments['type'])
+        result_cache.set(cache_key, result, result.nbytes)
+        return result
     
-    # Case 1: Results is a dict with 'data' key
-    if isinstance(results, dict):
-        if 'status' in results:
-            status = results.get('status', 'unknown')
-            result_text += f"📈 Status: {status}\n\n"
-        
-        if 'data' in results:
-            data_list = results['data']
-    
-    # Case 2: Results is directly a list (like your example)
-    elif isinstance(results, list):
-        d# Enable logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    level=logging.INFO,
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('bot.log')
-    ]
-)
-logger = logging.getLogger(__name__)
+    if cache_key not in inflight_searches:
+        # Reject an over-quota user here rather than everyone who would join their search
+        admission.check(user_id, background)
+    return await inflight_searches.do(cache_key, search_and_cache)
 
-# Set httpx and telegram logging to WARNING to reduce noise
-logging.getLogger('httpx').setLevel(logging.WARNING)
-logging.getLogger('telegram').setLevel(logging.WARNING)
+async def refresh_cached_search(cache_key: tuple, search_data: dict) -> None:
+    """Re-run a search in the background to replace a stale cache entry"""
+    try:
+        # Background refreshes skip the per-user quotas and share the background lane's slots
+        await run_shared_search(cache_key, search_data, background=True)
+        logger.info("Refreshed stale cache entry: %s", cache_key)
+    except Exception as e:
+        logger.warning("Background refresh of %s failed: %s", cache_key, e)
+    finally:
+        result_cache.end_refresh(cache_key)
 
-# Bot Token - Replace with your bot token
-BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "YOU TELEGRAM TOKEN HERE")
+def parse_multisearch_queries(text: str) -> list:
+    """Split a pasted list (one per line or comma-separated) into unique queries"""
+    queries = []
+    seen = set()
+    for line in text.replace(',', '\n').splitlines():
+        query = line.strip()
+        if query and query.casefold() not in seen:
+            seen.add(query.casefold())
+            queries.append(query)
+    return queries[:MULTISEARCH_MAX_QUERIES]
 
-# Gopher AI API Configuration
-GOPHER_API_TOKEN = os.environ.get("GOPHER_API_TOKEN", "YOU GOPHER API TOKEN HERE")
-GOPHER_API_BASE = "https://data.gopher-ai.com/api/v1"
+async def multisearch_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handler for /multisearch command"""
+    parts = update.message.text.split(None, 1)
+    queries = parse_multisearch_queries(parts[1]) if len(parts) > 1 else []
+    if queries:
+        await execute_multisearch(update, queries)
+        return
+    
+    await store_call(search_states.set, update.effective_user.id, {
+        'step': 'multi_query_input',
+        'platform': 'twitter',
+        'search_type': 'searchbyquery'
+    })
+    await send_reply(
+        update,
+        f"🔍 Multi-search\n\n"
+        f"📝 Send up to {MULTISEARCH_MAX_QUERIES} keywords or handles, one per line or separated by commas.\n\n"
+        f"Example:\n"
+        f"from:gopher_ai\n"
+        f"#web3\n"
+        f"python tutorial"
+    )
 
-# Store user search state
-search_states = {}
+def item_key(record) -> str:
+    """Tweet ID used to drop items already shown for another query"""
+    if isinstance(record, TweetRecord):
+        # Posts without a tweet ID fall back to their item ID
+        return record.key
+    return record.id
 
-async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler for /start command"""
-    await update.message.reply_text(
-        "🔍 Welcome to Gopher Explore Bot! 🔍\n\n"
-        "Your AI-powered companion for exploring digital content across platforms.\n\n"
-        "I can analyze:\n"
-        "🔐 Social media accounts and profiles\n"
-        "🔑 Keywords and trends\n"
-        "🌐 Web content and websites\n"
-        "🎵 TikTok videos and hashtags\n"
-        "💬 Reddit posts and discussions\n\n"
-        "⚡ Powered by Gopher AI\n"
-        "📊 https://data.gopher-ai.com\n\n"
-        "🛠️ Commands: /start • /help • /info • /search\n\n"
-        "💡 Simply send me usernames, keywords, or URLs to begin exploring!\n\n"
-        "🚀 Your digital discovery journey starts here!"
+async def execute_multisearch(update: Update, queries: list, search_type: str = 'searchbyquery') -> None:
+    """Run several searches concurrently and send each query's new results as it completes"""
+    user_id = update.effective_user.id
+    logger.info("User %s starting multi-search with %s queries", user_id, len(queries))
+    
+    progress = ProgressTracker(outbound, update.message)
+    await progress.start(f"🔄 Multi-search: starting {len(queries)} queries...")
+    
+    slots = asyncio.Semaphore(MULTISEARCH_CONCURRENCY)
+    seen = set()
+    totals = {'done': 0, 'failed': 0, 'running': 0, 'duplicates': 0}
+    
+    def show_status() -> None:
+        progress.update(
+            f"⏳ Multi-search: {totals['done'] + totals['failed']}/{len(queries)} queries finished\n\n"
+            f"🔄 Running: {totals['running']}\n"
+            f"❌ Failed: {totals['failed']}\n"
+            f"📊 Unique results so far: {len(seen)}"
+        )
+    
+    async def run_query(query: str) -> None:
+        async with slots:
+            totals['running'] += 1
+            show_status()
+            state = {'platform': 'twitter', 'search_type': search_type, 'query': query}
+            try:
+                result, _, stale_age = await fetch_search_results(build_search_data(state), user_id=user_id)
+            except Exception as e:
+                totals['failed'] += 1
+                await send_reply(update, f"🔎 {query}\n\n{describe_search_error(e)}", priority=PRIORITY_RESULT)
+                return
+            finally:
+                totals['running'] -= 1
+            
+            totals['done'] += 1
+            items = result.items or []
+            if archive is not None:
+                archive.record_search(user_id, state['platform'], search_type, query, len(items))
+            new_items = []
+            for item in items:
+                key = item_key(item)
+                if key is not None:
+                    if key in seen:
+                        totals['duplicates'] += 1
+                        continue
+                    seen.add(key)
+                new_items.append(item)
+            show_status()
+            
+            if not new_items:
+                await send_reply(
+                    update,
+                    f"🔎 {query}\n\n📊 No new results ({len(items)} found, all shown for earlier queries).",
+                    priority=PRIORITY_RESULT
+                )
+                return
+            header = (
+                f"{stale_notice(stale_age) if stale_age is not None else ''}"
+                f"✅ MULTI-SEARCH {totals['done'] + totals['failed']}/{len(queries)}\n\n"
+                f"📝 Query: {query}\n"
+                f"🔁 Already shown: {len(items) - len(new_items)}\n\n"
+            )
+            text, reply_markup = await store_results(search_type, header, new_items)
+            await send_reply(update, text, priority=PRIORITY_RESULT, reply_markup=reply_markup)
+    
+    results = await asyncio.gather(*(run_query(query) for query in queries), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error("Multi-search query failed to report: %s", result)
+    
+    await progress.finish(
+        f"✅ Multi-search finished\n\n"
+        f"🔎 Queries: {len(queries)} ({totals['failed']} failed)\n"
+        f"📊 Unique results: {len(seen)}\n"
+        f"🔁 Duplicates removed: {totals['duplicates']}"
     )
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler for /help command"""
-    help_text = (
-        "🤖 **Telegram Bot Help**\n\n"
-        "Available commands:\n\n"
-        "• `/start` - Start bot and display welcome message\n"
-        "• `/help` - Show this help message\n"
-        "• `/info` - Display bot information\n\n"
-        "Bot features:\n"
-        "✅ Responds to text messages\n"
-        "✅ Echo sent messages\n"
-        "✅ Basic text formatting\n\n"
-        "This is a basic template that can be further developed."
+def results_head(entry: dict, start: int, end: int) -> str:
+    return (
+        f"{entry['header']}"
+        f"📊 Found {len(entry['items'])} results ({start + 1}-{end}):\n\n"
+        f"{RULE}"
     )
-    await update.message.reply_text(help_text, parse_mode='Markdown')
-
-async def info_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler for /info command"""
-    user = update.effective_user
-    chat_info = f"""
-📊 **Bot Information**
 
-**Chat Info:**
-• Chat ID: {update.effective_chat.id}
-• Chat Type: {update.effective_chat.type}
-• Chat Name: {update.effective_chat.title or 'Private Chat'}
+async def store_results(search_type: str, header: str, items: list):
+    """Keep a result list server-side for Prev/Next; returns its first page as (text, reply_markup)"""
+    entry = {
+        'id': secrets.randbits(48),
+        'search_type': search_type,
+        'header': header,
+        'items': items
+    }
+    with RENDER_SECONDS.time():
+        page = render_results_page(entry, 0)
+    await store_call(result_pages.set, entry['id'], entry)
+    return page
 
-**User Info:**
-• Name: {user.first_name} {user.last_name or ''}
-• Username: @{user.username}
-• User ID: {user.id}
+def render_results_page(entry: dict, page: int):
+    """Render one page of stored results; returns (text, reply_markup).
 
-**Bot Info:**
-• Status: 🟢 Online
-• Version: 1.0.0
-• Framework: python-telegram-bot
+    Pages are sized to fit one message. entry['pages'] holds the first item of each
+    page found so far; a page's end is found by rendering forward from its start the
+    first time it is shown, so pages nobody opens are never rendered.
     """
-    await update.message.reply_text(chat_info, parse_mode='Markdown')
+    items = entry['items']
+    pages = entry.setdefault('pages', [0])
+    page = max(page, 0)
+    # Sized with the longest head any page of this entry can have
+    sizing_head = results_head(entry, len(items), len(items))
+    blocks = None
+    while len(pages) <= page + 1 and pages[-1] < len(items):
+        start = pages[-1]
+        blocks = fit_blocks(
+            sizing_head,
+            (render_items([record], i)[0] for i, record in enumerate(items[start:start + RESULTS_PER_PAGE], start + 1)),
+            RESULTS_PER_PAGE
+        )
+        pages.append(start + len(blocks))
+    page = max(0, min(page, len(pages) - 2))
+    start = pages[page]
+    end = pages[page + 1] if page + 1 < len(pages) else len(items)
+    if blocks is None or pages[-2] != start:
+        blocks = render_items(items[start:end], start + 1)
+    
+    buttons = []
+    if page > 0:
+        buttons.append(InlineKeyboardButton("◀️ Prev", callback_data=f"page:{entry['id']}:{page - 1}"))
+    if end < len(items):
+        buttons.append(InlineKeyboardButton("Next ▶️", callback_data=f"page:{entry['id']}:{page + 1}"))
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
+    
+    # The page boundaries already keep head and items within one message
+    return pack_chunks(results_head(entry, start, end), blocks)[0], reply_markup
 
-async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handler for /search command"""
+async def watch_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handler for /watch command: get new results for a query as they appear"""
     user_id = update.effective_user.id
+    parts = update.message.text.split(None, 1)
+    query = parts[1].strip() if len(parts) > 1 else ""
     
-    # Store search state for this user
-    search_states[user_id] = {
-        'step': 'type_selection',
-        'platform': 'twitter'
-    }
+    if not query:
+        watched = watches.list(user_id)
+        if not watched:
+            await send_reply(update, "👀 You are not watching anything.\n\nUsage: /watch <query>\nExample: /watch from:gopher_ai")
+            return
+        lines = ["👀 You are watching:\n"]
+        lines.extend(f"[{i}] {watched_query}" for i, watched_query in enumerate(watched, 1))
+        lines.append("\n💡 /unwatch <number> stops watching.")
+        await send_reply(update, "\n".join(lines))
+        return
     
-    # Create inline keyboard with search type options
-    keyboard = [
-        [InlineKeyboardButton("🔍 Search by Query", callback_data="searchbyquery")],
-        [InlineKeyboardButton("👤 Search by Profile", callback_data="searchbyprofile")],
-        [InlineKeyboardButton("📚 Full Archive Search", callback_data="searchbyfullarchive")],
-        [InlineKeyboardButton("🆔 Get by ID", callback_data="getbyid")],
-        [InlineKeyboardButton("💬 Get Replies", callback_data="getreplies")],
-        [InlineKeyboardButton("🔄 Get Retweeters", callback_data="getretweeters")],
-        [InlineKeyboardButton("📝 Get Tweets", callback_data="gettweets")],
-        [InlineKeyboardButton("🎬 Get Media", callback_data="getmedia")],
-        [InlineKeyboardButton("👥 Get Profile by ID", callback_data="getprofilebyid")],
-        [InlineKeyboardButton("📈 Get Trends", callback_data="gettrends")],
-        [InlineKeyboardButton("➕ Get Following", callback_data="getfollowing")],
-        [InlineKeyboardButton("👨‍👩‍👧‍👦 Get Followers", callback_data="getfollowers")],
-        [InlineKeyboardButton("🎙️ Get Space", callback_data="getspace")],
-        [InlineKeyboardButton("📋 Get Profile", callback_data="getprofile")]
-    ]
+    search_data = build_search_data({'platform': 'twitter', 'search_type': 'searchbyquery', 'query': query})
+    try:
+        added = watches.add(user_id, update.effective_chat.id, query, search_data)
+    except ValueError:
+        await send_reply(update, f"❌ You can watch at most {WATCH_MAX_PER_USER} queries. Use /unwatch first.")
+        return
     
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    if added:
+        logger.info("User %s watching: %s", user_id, query[:100])
+        await send_reply(
+            update,
+            f"👀 Watching: {query}\n\n"
+            f"🔔 I'll send new results as they appear (checked every few minutes).\n"
+            f"🛑 /unwatch {query} to stop."
+        )
+    else:
+        await send_reply(update, f"👀 You are already watching: {query}")
+
+async def unwatch_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handler for /unwatch command"""
+    user_id = update.effective_user.id
+    parts = update.message.text.split(None, 1)
+    query = parts[1].strip() if len(parts) > 1 else ""
+    watched = watches.list(user_id)
+    if query.isdigit() and 1 <= int(query) <= len(watched):
+        query = watched[int(query) - 1]
     
-    await update.message.reply_text(
-        "🔍 Choose search type:\n\n"
-        "Select one of the options below:",
-        reply_markup=reply_markup
+    search_data = build_search_data({'platform': 'twitter', 'search_type': 'searchbyquery', 'query': query})
+    if query and watches.remove(user_id, search_data):
+        await send_reply(update, f"🛑 Stopped watching: {query}")
+    else:
+        await send_reply(update, "❌ Not watching that. Send /watch to see your watches.")
+
+async def fetch_watched_items(search_data: dict) -> list:
+    """Fresh results for a watched query (bypasses the cache, refreshes it for everyone)"""
+    cache_key = make_cache_key(search_data)
+    # Refreshes skip the per-user quotas; the background lane bounds how many run at once
+    result = await run_shared_search(cache_key, search_data, user_id='watch', background=True)
+    return result.items or []
+
+async def deliver_watch_results(bot: Bot, chat_id: int, query: str, items: list) -> None:
+    """Send a watcher the new results for one of their queries"""
+    text, reply_markup = await store_results('searchbyquery', f"🔔 NEW RESULTS\n\n📝 Watching: {query}\n\n", items)
+    await outbound.send(
+        chat_id,
+        lambda: bot.send_message(chat_id, text, reply_markup=reply_markup),
+        PRIORITY_NORMAL
     )
 
-async def search_type_button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle button callback for search type selection"""
-    query = update.callback_query
-    await query.answer()
+def parse_export_args(text: str):
+    """(fmt, compress, search_type, query) from "/export [csv|jsonl] [gz] <type> <query>", or None"""
+    words = text.split()[1:]
+    fmt = 'csv'
+    compress = False
+    while words and words[0].lower() in EXPORT_FORMATS + ('gz', 'gzip'):
+        option = words.pop(0).lower()
+        if option in EXPORT_FORMATS:
+            fmt = option
+        else:
+            compress = True
+    if len(words) < 2:
+        return None
+    search_type = EXPORT_ALIASES.get(words[0].lower(), words[0].lower())
+    if search_type not in EXPORT_SEARCH_TYPES:
+        return None
+    return fmt, compress, search_type, " ".join(words[1:])
+
+async def export_search(search_data: dict, writer: ExportWriter, user_id: int, on_page=None) -> int:
+    """Page through a search into writer until the last page or EXPORT_MAX_ROWS; returns pages fetched"""
+    arguments = search_data['arguments']
+    pages = 0
+    while writer.rows < EXPORT_MAX_ROWS:
+        # Pages bypass the result cache: they are read once and would evict everyone else's results
+        async with admission.admit(user_id, arguments['type']):
+            result = await gopher_client.search(search_data, POLL_POLICY)
+        pages += 1
+        items = (result.items or [])[:EXPORT_MAX_ROWS - writer.rows]
+        cursor = next_cursor(result.data)
+        # Only the current page is held in memory
+        del result
+        new_rows = await asyncio.to_thread(writer.write, items)
+        if on_page is not None:
+            on_page(pages)
+        if cursor is None or new_rows == 0:
+            break
+        arguments['next_cursor'] = cursor
+    return pages
+
+async def export_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handler for /export command: page through a large result set into a CSV or JSONL document"""
+    user_id = update.effective_user.id
+    parsed = parse_export_args(update.message.text)
+    if parsed is None:
+        await send_reply(
+            update,
+            "📦 Export a large result set as a file.\n\n"
+            "Usage: /export [csv|jsonl] [gz] <type> <query>\n"
+            "Types: followers, following, retweeters, tweets, or a search type such as getreplies\n\n"
+            "Example: /export jsonl gz followers gopher_ai"
+        )
+        return
+    fmt, compress, search_type, query = parsed
+    logger.info("User %s exporting %s as %s%s: %s",
+                user_id, search_type, fmt, ' (gzip)' if compress else '', query[:100])
     
-    user_id = query.from_user.id
-    search_type = query.data
+    search_data = build_search_data({'platform': 'twitter', 'search_type': search_type, 'query': query})
+    search_data['arguments']['max_results'] = EXPORT_PAGE_SIZE
+    suffix = f".{fmt}.gz" if compress else f".{fmt}"
+    filename = search_type + "-" + re.sub(r"[^\w.-]+", "_", query)[:40] + suffix
+    fd, path = tempfile.mkstemp(prefix="export-", suffix=suffix, dir=EXPORT_DIR)
+    os.close(fd)
+    
+    progress = ProgressTracker(outbound, update.message)
+    await progress.start(f"📦 Exporting {search_type}: {query}...")
+    try:
+        writer = ExportWriter(path, fmt, search_type, compress)
+        stopped = ""
+        try:
+            pages = await export_search(
+                search_data, writer, user_id,
+                on_page=lambda pages: progress.update(f"📦 Exporting... {writer.rows} rows from {pages} pages")
+            )
+        except Exception as e:
+            if writer.rows == 0:
+                raise
+            # Send what was fetched before the failure
+            stopped = f"\n\n⚠️ Export stopped early:\n{describe_search_error(e)}"
+            pages = None
+        finally:
+            await asyncio.to_thread(writer.close)
+        
+        if writer.rows == 0:
+            await progress.finish(f"📊 No results found for: {query}")
+            return
+        size = os.path.getsize(path)
+        if size > EXPORT_MAX_BYTES:
+            await progress.finish(
+                f"❌ The export is {size / 1e6:.0f} MB, over Telegram's 50 MB limit.\n\n"
+                f"💡 Try again with gz."
+            )
+            return
+        
+        caption = f"📦 {writer.rows} rows · {search_type}: {query}"
+        if writer.rows >= EXPORT_MAX_ROWS:
+            caption += f"\n✂️ Stopped at the {EXPORT_MAX_ROWS} row limit"
+        await outbound.send(
+            update.message.chat_id,
+            lambda: update.message.reply_document(Path(path), filename=filename, caption=caption[:1024]),
+            PRIORITY_RESULT
+        )
+        logger.info("Exported %s rows (%s bytes) for user %s", writer.rows, size, user_id)
+        await progress.finish(
+            f"✅ Export finished: {writer.rows} rows"
+            f"{f' from {pages} pages' if pages else ''}, {writer.duplicates} duplicates skipped{stopped}"
+        )
     
-    logger.info(f"User {user_id} selected search type: {search_type}")
+    except Exception as e:
+        await progress.finish(describe_search_error(e))
     
-    # Check if user has an active search state
-    if user_id not in search_states:
-        logger.warning(f"User {user_id} has no active search state")
-        await query.edit_message_text("❌ Search session expired. Please use /search to start again.")
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handler for /history command: the user's recent searches from the local archive"""
+    if archive is None:
+        await send_reply(update, "❌ The local archive is disabled on this bot.")
         return
     
-    # Update search state
-    search_states[user_id]['search_type'] = search_type
-    search_states[user_id]['step'] = 'query_input'
+    rows = await asyncio.to_thread(archive.history, update.effective_user.id, HISTORY_LIMIT)
+    if not rows:
+        await send_reply(update, "🕘 No searches yet. Use /search to start one.")
+        return
     
-    logger.info(f"User {user_id} state updated: {search_states[user_id]}")
+    lines = ["🕘 Your recent searches:\n"]
+    for i, (search_type, query, item_count, searched_at) in enumerate(rows, 1):
+        when = datetime.fromtimestamp(searched_at, timezone.utc).strftime('%Y-%m-%d %H:%M')
+        lines.append(f"[{i}] {query}\n   🎯 {search_type} | 📊 {item_count} results | 📅 {when} UTC")
+    lines.append("\n💡 Use /find <words> to search everything fetched so far.")
+    await send_reply(update, "\n".join(lines))
+
+async def find_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handler for /find command: full-text search of archived results, no API call"""
+    if archive is None:
+        await send_reply(update, "❌ The local archive is disabled on this bot.")
+        return
     
-    # Show query input prompt
-    examples = "Examples: 'from:gopher_ai', 'python tutorial', '#web3', 'Elon Musk'"
+    parts = update.message.text.split(None, 1)
+    text = parts[1].strip() if len(parts) > 1 else ""
+    if not text:
+        await send_reply(update, "🔎 Usage: /find <words>\n\nExample: /find gopher ai")
+        return
     
-    await query.edit_message_text(
-        f"✅ Search type set to: {search_type}\n\n"
-        f"💬 What do you want to search for?\n\n"
-        f"{examples}\n\n"
-        f"📝 Reply with your search query:"
+    items = await asyncio.to_thread(archive.find, text, SEARCH_MAX_RESULTS)
+    if not items:
+        await send_reply(update, f"🔎 Nothing in the local archive matches: {text}\n\nTry /search to ask the Gopher API.")
+        return
+    
+    page_text, reply_markup = await store_results('searchbyquery', f"🗂️ LOCAL ARCHIVE\n\n📝 Find: {text}\n\n", items)
+    await send_reply(update, page_text, priority=PRIORITY_RESULT, reply_markup=reply_markup)
+
+def inline_article(i: int, record) -> InlineQueryResultArticle:
+    """One inline result: a short preview that sends the rendered record when picked"""
+    username = getattr(record, 'username', "")
+    content = getattr(record, 'content', None) or getattr(record, 'description', None) or getattr(record, 'name', "")
+    text = render_items([record], i)[0]
+    if text.endswith(SEPARATOR):
+        text = text[:-len(SEPARATOR)]
+    return InlineQueryResultArticle(
+        id=str(item_key(record) or i)[:64],
+        title=f"@{username}" if username else (content[:60] or f"Result {i}"),
+        description=content[:120],
+        input_message_content=InputTextMessageContent(split_text(text)[0])
     )
 
-async def handle_search_step(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle interactive search steps"""
-    user_id = update.effective_user.id
-    user_message = update.message.text.strip()
-    
-    logger.info(f"User {user_id} sent message: {user_message[:100]}")
-    
-    # Check if user is in search process
-    if user_id not in search_states:
-        logger.info(f"User {user_id} not in search state, ignoring")
+async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Answer @bot queries from cached results, paging with next_offset"""
+    inline_query = update.inline_query
+    text = inline_query.query.strip()
+    user_id = inline_query.from_user.id
+    if len(text) < INLINE_MIN_QUERY:
+        await answer_inline_query(inline_query, [], cache_time=INLINE_CACHE_TIME)
         return
     
-    state = search_states[user_id]
-    logger.info(f"User {user_id} current state: {state}")
+    search_data = build_search_data({'platform': 'twitter', 'search_type': 'searchbyquery', 'query': text})
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
     
-    # Handle query input
-    if state['step'] == 'query_input':
-        # Store query and execute search
-        state['query'] = user_message
-        state['step'] = 'searching'
-        
-        logger.info(f"User {user_id} starting search with query: {user_message}")
-        
-        await update.message.reply_text("🔄 Starting search... Please wait a moment.")
-        
-        # Execute search
-        await execute_gopher_search(update, state)
-
-async def execute_gopher_search(update: Update, state: dict) -> None:
-    """Execute search using Gopher AI API"""
-    import time
-    import asyncio
+    async def lookup():
+        if make_cache_key(search_data) not in result_cache:
+            if offset > 0:
+                # Next page of a result that has since expired: nothing more to show
+                return None
+            # Still typing? The next keystroke cancels this before it reaches the API
+            await asyncio.sleep(INLINE_DEBOUNCE)
+        result, _, _ = await fetch_search_results(search_data, user_id=user_id)
+        return result
     
-    user_id = update.effective_user.id
+    previous = inline_lookups.get(user_id)
+    if previous is not None:
+        previous.cancel()
+    task = asyncio.create_task(lookup())
+    inline_lookups[user_id] = task
+    try:
+        result = await asyncio.wait_for(asyncio.shield(task), INLINE_ANSWER_TIMEOUT)
+    except asyncio.CancelledError:
+        if asyncio.current_task().cancelling():
+            # The handler itself is being cancelled (shutdown), not superseded
+            task.cancel()
+            raise
+        logger.debug("Inline query %r from %s superseded", text, user_id)
+        return
+    except TimeoutError:
+        # Too slow to answer in time: let the search finish and fill the cache for the next try
+        logger.info("Inline query from %s not ready after %ss, answering empty", user_id, INLINE_ANSWER_TIMEOUT)
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+        task.add_done_callback(inline_lookup_done)
+        await answer_inline_query(inline_query, [], cache_time=INLINE_RETRY_CACHE_TIME)
+        return
+    except Exception as e:
+        describe_search_error(e)
+        await answer_inline_query(inline_query, [], cache_time=0)
+        return
+    finally:
+        if inline_lookups.get(user_id) is task:
+            del inline_lookups[user_id]
     
+    items = (result.items or []) if result is not None else []
+    page = items[offset:offset + INLINE_PAGE_SIZE]
+    next_offset = str(offset + INLINE_PAGE_SIZE) if offset + INLINE_PAGE_SIZE < len(items) else ""
+    await answer_inline_query(
+        inline_query,
+        [inline_article(offset + i, record) for i, record in enumerate(page, 1)],
+        cache_time=INLINE_CACHE_TIME,
+        next_offset=next_offset
+    )
+
+async def answer_inline_query(inline_query, results: list, **kwargs) -> None:
+    """Answer an inline query, ignoring Telegram's refusal once the query has expired"""
     try:
-        # First request - start search
-        search_data = {
-            "type": state['platform'],
-            "arguments": {
-                "type": state['search_type'],
-                "query": state['query'],
-                "max_results": 5
-            }
-        }
-        
-        headers = {
-            "Authorization": f"Bearer {GOPHER_API_TOKEN}",
-            "Content-Type": "application/json"
-        }
-        
-        logger.info(f"Starting search for user {user_id}")
-        logger.info(f"Request URL: {GOPHER_API_BASE}/search/live")
-        logger.info(f"Request data: {json.dumps(search_data, indent=2)}")
-        
-        # Start search
-        response = requests.post(
-            f"{GOPHER_API_BASE}/search/live",
-            headers=headers,
-            json=search_data,
-            timeout=30
-        )
-        
-        logger.info(f"Search start response status: {response.status_code}")
-        logger.info(f"Search start response: {response.text}")
-        
-        if response.status_code != 200:
-            error_msg = f"❌ API ERROR {response.status_code}\n\n"
-            try:
-                error_data = response.json()
-                error_msg += f"Error: {json.dumps(error_data, indent=2)}"
-            except:
-                error_msg += f"Response: {response.text[:500]}"
-            
-            await update.message.reply_text(error_msg)
-            del search_states[user_id]
-            return
-        
-        search_result = response.json()
-        logger.info(f"Search result response: {json.dumps(search_result, indent=2)}")
-        
-        # Check for error in response
-        if 'error' in search_result and search_result['error']:
-            logger.error(f"API returned error: {search_result['error']}")
-            await update.message.reply_text(
-                f"❌ API Error\n\n"
-                f"Error: {search_result['error']}\n\n"
-                f"Please try again or contact support."
-            )
-            del search_states[user_id]
-            return
-        
-        # Extract UUID
-        if 'uuid' not in search_result:
-            logger.error(f"No UUID in response: {search_result}")
-            await update.message.reply_text(
-                f"❌ Invalid API response (no UUID)\n\n"
-                f"Response: {json.dumps(search_result, indent=2)[:500]}"
-            )
-            del search_states[user_id]
-            return
-        
-        uuid = search_result['uuid']
-        logger.info(f"✓ Search UUID received: {uuid}")
-        await update.message.reply_text(
-            f"⏳ Search initiated successfully!\n\n"
-            f"🆔 Search ID: {uuid[:8]}...\n\n"
-            f"Fetching results..."
-        )
-        
-        # Poll for results with retry logic
-        max_retries = 10
-        retry_delay = 2  # seconds
-        
-        for attempt in range(max_retries):
-            logger.info(f"Fetching results, attempt {attempt + 1}/{max_retries}")
-            
-            result_url = f"{GOPHER_API_BASE}/search/live/result/{uuid}"
-            logger.info(f"Requesting endpoint 2: {result_url}")
-            logger.info(f"Using UUID: {uuid}")
-            
-            result_response = requests.get(
-                result_url,
-                headers=headers,
-                timeout=30
-            )
-            
-            logger.info(f"Result fetch status: {result_response.status_code}")
-            logger.info(f"Result fetch response: {result_response.text[:500]}")
-            
-            if result_response.status_code != 200:
-                if attempt < max_retries - 1:
-                    logger.warning(f"Retry {attempt + 1}, status: {result_response.status_code}")
-                    await asyncio.sleep(retry_delay)
-                    continue
-                else:
-                    error_msg = f"❌ Failed to get results after {max_retries} attempts\n\n"
-                    error_msg += f"Status: {result_response.status_code}\n"
-                    try:
-                        error_data = result_response.json()
-                        error_msg += f"Response: {json.dumps(error_data, indent=2)[:500]}"
-                    except:
-                        error_msg += f"Response: {result_response.text[:500]}"
-                    
-                    await update.message.reply_text(error_msg)
-                    del search_states[user_id]
-                    return
-            
-            results = result_response.json()
-            logger.info(f"Results type: {type(results)}, length: {len(results) if isinstance(results, (list, dict)) else 'N/A'}")
-            
-            # Case 1: Results is a list (actual data)
-            if isinstance(results, list):
-                if len(results) > 0:
-                    # Results ready!
-                    logger.info(f"✓ Results ready, found {len(results)} items")
-                    await display_search_results(update, state, results)
-                    break
-                else:
-                    # Empty list means results not ready yet
-                    if attempt < max_retries - 1:
-                        logger.info("Results not ready yet (empty list), retrying...")
-                        await update.message.reply_text(f"⏳ Processing... ({attempt + 1}/{max_retries})")
-                        await asyncio.sleep(retry_delay)
-                        continue
-                    else:
-                        logger.warning("Results not ready after max retries")
-                        await update.message.reply_text(
-                            f"⚠️ Search is taking longer than expected.\n\n"
-                            f"🆔 UUID: {uuid}\n\n"
-                            f"The search may still be processing. Please try again in a few moments."
-                        )
-                        del search_states[user_id]
-                        return
-            
-            # Case 2: Results is a dict (could be error or wrapped data)
-            elif isinstance(results, dict):
-                # Check for error
-                if 'error' in results and results['error']:
-                    error_detail = results['error']
-                    logger.error(f"Search failed with error: {error_detail}")
-                    await update.message.reply_text(
-                        f"❌ Search Failed\n\n"
-                        f"Error: {error_detail}\n\n"
-                        f"Please try again or use different search parameters."
-                    )
-                    del search_states[user_id]
-                    return
-                
-                # Check for data field (wrapped response)
-                elif 'data' in results:
-                    logger.info("Results wrapped in 'data' field")
-                    await display_search_results(update, state, results)
-                    break
-                
-                # Check for status field (legacy format)
-                elif 'status' in results:
-                    status = results.get('status', 'unknown')
-                    logger.info(f"Result status: {status}")
-                    
-                    # Normalize status (replace spaces with underscores, lowercase)
-                    status_normalized = status.lower().replace(' ', '_')
-                    
-                    if status_normalized in ['in_progress', 'pending', 'processing']:
-                        if attempt < max_retries - 1:
-                            logger.info(f"Status '{status}' indicates not ready, retrying...")
-                            await update.message.reply_text(f"⏳ Processing... ({attempt + 1}/{max_retries})")
-                            await asyncio.sleep(retry_delay)
-                            continue
-                        else:
-                            logger.warning(f"Max retries reached, status still: {status}")
-                            await update.message.reply_text(
-                                f"⚠️ Search timeout\n\n"
-                                f"Status: {status}\n"
-                                f"UUID: {uuid}\n\n"
-                                f"The search is taking longer than expected. Please try again later."
-                            )
-                            del search_states[user_id]
-                            return
-                    
-                    elif status_normalized in ['completed', 'success', 'done', 'finished']:
-                        logger.info("Results ready (status completed)")
-                        await display_search_results(update, state, results)
-                        break
-                    
-                    elif status_normalized in ['failed', 'error', 'cancelled']:
-                        error_detail = results.get('error', results.get('message', 'Unknown error'))
-                        if not error_detail or error_detail == "":
-                            error_detail = f"Search status: {status}"
-                        logger.error(f"Search failed: {error_detail}")
-                        await update.message.reply_text(
-                            f"❌ Search failed\n\n"
-                            f"Error: {error_detail}"
-                        )
-                        del search_states[user_id]
-                        return
-                    
-                    else:
-                        # Unknown status - treat as not ready and retry
-                        logger.warning(f"Unknown status '{status}', treating as in_progress")
-                        if attempt < max_retries - 1:
-                            await update.message.reply_text(f"⏳ Processing... ({attempt + 1}/{max_retries})")
-                            await asyncio.sleep(retry_delay)
-                            continue
-                        else:
-                            await update.message.reply_text(
-                                f"⚠️ Unknown status: {status}\n\n"
-                                f"UUID: {uuid}\n\n"
-                                f"Please try again later."
-                            )
-                            del search_states[user_id]
-                            return
-                
-                # Unknown dict format, try to display
-                else:
-                    logger.warning(f"Unknown dict format, displaying as-is")
-                    await display_search_results(update, state, results)
-                    break
-            
-            # Case 3: Unexpected format
-            else:
-                logger.error(f"Unexpected results type: {type(results)}")
-                await update.message.reply_text(
-                    f"❌ Unexpected response format\n\n"
-                    f"Type: {type(results)}\n"
-                    f"Please contact support."
-                )
-                del search_states[user_id]
-                return
-        
-        # Clean up state
-        if user_id in search_states:
-            del search_states[user_id]
-        
-    except requests.exceptions.Timeout:
-        logger.error("Request timeout")
-        await update.message.reply_text("❌ Request timeout. API took too long to respond.")
-        if user_id in search_states:
-            del search_states[user_id]
+        await inline_query.answer(results, **kwargs)
+    except BadRequest as e:
+        logger.debug("Inline query %s not answered: %s", inline_query.id, e)
+
+def inline_lookup_done(task: asyncio.Task) -> None:
+    """Log and count a failure of an inline lookup left running after its query was answered"""
+    if not task.cancelled() and task.exception() is not None:
+        describe_search_error(task.exception())
+
+async def results_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle Prev/Next buttons under paginated results"""
+    query = update.callback_query
+    _, page_id, page = query.data.split(':')
     
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Request error: {str(e)}")
-        await update.message.reply_text(f"❌ Network error: {str(e)}")
-        if user_id in search_states:
-            del search_states[user_id]
+    entry = await store_call(result_pages.get, int(page_id))
+    if entry is None:
+        await query.answer("These results have expired. Please use /search again.", show_alert=True)
+        return
+    await query.answer()
     
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
-        await update.message.reply_text(
-            f"❌ Unexpected error: {str(e)}\n\n"
-            f"Please try again or contact support."
-        )
-        if user_id in search_states:
-            del search_states[user_id]
+    known_pages = len(entry.get('pages', ()))
+    text, reply_markup = render_results_page(entry, int(page))
+    if len(entry['pages']) != known_pages:
+        # Keep the newly found page boundary for the next Prev/Next
+        await store_call(result_pages.set, int(page_id), entry)
+    await send_edit(query, text, priority=PRIORITY_RESULT, reply_markup=reply_markup)
 
-async def display_search_results(update: Update, state: dict, results) -> None:
-    """Display search results"""
-    logger.info(f"Displaying results type: {type(results)}")
-    logger.info(f"Results preview: {json.dumps(results, indent=2)[:1000] if not isinstance(results, str) else results[:1000]}")
+async def display_search_results(update: Update, state: dict, result, progress: ProgressTracker = None,
+                                 notice: str = "") -> None:
+    """Display a GopherResult (notice, e.g. a stale-results warning, goes above the header)"""
+    data = result.data
+    logger.info("Displaying %s results", len(result.items) if result.items is not None else 'non-list')
     
     result_text = (
+        f"{notice}"
         f"✅ SEARCH COMPLETED\n\n"
         f"🎯 Type: {state['search_type']}\n"
         f"📝 Query: {state['query']}\n"
         f"🌐 Platform: {state['platform']}\n\n"
     )
     
-    # Handle results based on type
-    data_list = None
-    
-    # Case 1: Results is a dict with 'data' key
-    if isinstance(results, dict):
-        if 'status' in results:
-            status = results.get('status', 'unknown')
-            result_text += f"📈 Status: {status}\n\n"
-        
-        if 'data' in results:
-            data_list = results['data']
-    
-    # Case 2: Results is directly a list (like your example)
-    elif isinstance(results, list):
-        data_list = results
+    # Wrapped results may carry a status next to the data
+    if isinstance(data, dict) and 'status' in data:
+        result_text += f"📈 Status: {data.get('status', 'unknown')}\n\n"
     
-    # Process data list
-    if data_list and isinstance(data_list, list) and len(data_list) > 0:
-        result_text += f"📊 Found {len(data_list)} results:\n\n"
-        result_text += "=" * 40 + "\n\n"
-        
-        for i, item in enumerate(data_list[:10], 1):  # Show up to 10 results
-            if not isinstance(item, dict):
-                continue
-            
-            # Extract content/text
-            content = item.get('content') or item.get('text', '')
-            tweet_id = item.get('id', '')
-            source = item.get('source', 'unknown')
-            
-            # Get metadata
-            metadata = item.get('metadata', {})
-            
-            # Display content
-            if content:
-                # Truncate long content
-                display_content = content[:300] + "..." if len(content) > 300 else content
-                result_text += f"[{i}] {display_content}\n\n"
-            else:
-                result_text += f"[{i}] (No content)\n\n"
-            
-            # Display metadata
-            if metadata:
-                # Username
-                username = metadata.get('username', '')
-                if username:
-                    result_text += f"   👤 @{username}\n"
-                
-                # Created date
-                created_at = metadata.get('created_at', '')
-                if created_at:
-                    # Format date nicely
-                    try:
-                        from datetime import datetime
-                        dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                        formatted_date = dt.strftime('%Y-%m-%d %H:%M')
-                        result_text += f"   📅 {formatted_date} UTC\n"
-                    except:
-                        result_text += f"   📅 {created_at}\n"
-                
-                # Public metrics
-                public_metrics = metadata.get('public_metrics', {})
-                if public_metrics:
-                    likes = public_metrics.get('like_count', 0)
-                    retweets = public_metrics.get('retweet_count', 0)
-                    replies = public_metrics.get('reply_count', 0)
-                    quotes = public_metrics.get('quote_count', 0)
-                    
-                    if likes > 0 or retweets > 0 or replies > 0:
-                        result_text += f"   📊 "
-                        metrics = []
-                        if likes > 0:
-                            metrics.append(f"❤️ {likes}")
-                        if retweets > 0:
-                            metrics.append(f"🔄 {retweets}")
-                        if replies > 0:
-                            metrics.append(f"💬 {replies}")
-                        if quotes > 0:
-                            metrics.append(f"📝 {quotes}")
-                        result_text += " | ".join(metrics) + "\n"
-                
-                # Tweet/Post ID and link
-                tweet_id_meta = metadata.get('tweet_id') or metadata.get('id')
-                if tweet_id_meta and username:
-                    result_text += f"   🔗 https://twitter.com/{username}/status/{tweet_id_meta}\n"
-                elif tweet_id:
-                    result_text += f"   🆔 ID: {tweet_id}\n"
-            
-            result_text += "\n" + "-" * 40 + "\n\n"
-        
-        # Show if there are more results
-        if len(data_list) > 10:
-            result_text += f"... and {len(data_list) - 10} more results\n"
+    # Process item list: store it once and show it one page at a time
+    if result.items:
+        text, reply_markup = await store_results(state['search_type'], result_text, result.items)
+        if progress is not None:
+            await progress.finish(text, reply_markup=reply_markup)
+        else:
+            await send_reply(update, text, priority=PRIORITY_RESULT, reply_markup=reply_markup)
+        return
     
-    elif data_list and isinstance(data_list, dict):
-        # Single result as dict
+    # Anything else is shown as the start of the raw response body, never re-serialized
+    if isinstance(data, dict) and isinstance(data.get('data'), dict) and data['data']:
         result_text += f"📊 Single Result:\n\n"
-        data_str = json.dumps(data_list, indent=2)[:1000]
-        result_text += f"{data_str}\n"
+        result_text += f"{result.preview}\n"
     
-    elif data_list is not None and len(data_list) == 0:
+    elif result.items is not None:
         result_text += "📊 No results found.\n\n"
         result_text += "Try:\n"
         result_text += "• Different keywords\n"
         result_text += "• Broader search terms\n"
         result_text += "• Different search type\n"
     
-    elif isinstance(results, dict) and 'error' in results:
-        result_text += f"❌ Error: {results['error']}\n"
+    elif isinstance(data, dict) and 'error' in data:
+        result_text += f"❌ Error: {data['error']}\n"
     
     else:
         # Fallback: display raw results
         result_text += f"📊 Raw Results:\n\n"
-        try:
-            results_str = json.dumps(results, indent=2)[:800] if not isinstance(results, str) else str(results)[:800]
-            result_text += f"{results_str}\n"
-        except:
-            result_text += f"{str(results)[:800]}\n"
-    
-    # Split message if too long
-    if len(result_text) > 4000:
-        # Split into chunks
-        chunks = [result_text[i:i+4000] for i in range(0, len(result_text), 4000)]
-        for idx, chunk in enumerate(chunks):
-            if idx > 0:
-                import asyncio
-                await asyncio.sleep(0.5)  # Small delay between chunks
-            await update.message.reply_text(chunk)
+        result_text += f"{result.preview[:800]}\n"
+    
+    # Split message if too long (Telegram counts UTF-16 units)
+    with RENDER_SECONDS.time():
+        chunks = split_text(result_text)
+    
+    # The first chunk replaces the status message, the rest follow as replies
+    if progress is not None:
+        await progress.finish(chunks[0])
     else:
-        await update.message.reply_text(result_text)
+        await send_reply(update, chunks[0], priority=PRIORITY_RESULT)
+    for chunk in chunks[1:]:
+        await send_reply(update, chunk, priority=PRIORITY_RESULT)
 
 async def echo_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handler for regular text messages (echo)"""
     user_id = update.effective_user.id
     
     # Check if user is in search process
-    if user_id in search_states:
+    if await store_call(search_states.get, user_id) is not None:
         await handle_search_step(update, context)
         return
     
     # Regular echo for other messages
     user_message = update.message.text
     response = f"💬 You wrote:\n\n_{user_message}_\n\n✅ Message received successfully!"
-    await update.message.reply_text(response, parse_mode='Markdown')
+    await send_reply(update, response, parse_mode='Markdown')
 
 async def unknown_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handler for unknown commands"""
-    await update.message.reply_text(
+    await send_reply(
+        update,
         "❌ Unknown command. Type /help to see available commands."
     )
 
-def main() -> None:
-    """Main function to run the bot"""
-    # Validate token
-    if BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
-        print("❌ Error: BOT TOKEN not set!")
-        print("Please set the TELEGRAM_BOT_TOKEN environment variable")
-        print("or replace the BOT_TOKEN variable in main.py")
-        return
+async def sweep_sessions() -> None:
+    """Periodically drop expired search sessions and result pages"""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        try:
+            removed = await store_call(search_states.sweep)
+            if removed:
+                logger.info("Swept %s expired search sessions, %s active", removed, len(search_states))
+            # Also holds a shared result_pages table to its bound when workers write it too
+            await store_call(result_pages.sweep)
+        except Exception as e:
+            logger.error("Session sweep failed: %s", e)
+
+async def start_metrics() -> None:
+    """Start the metrics endpoint if METRICS_PORT is set"""
+    global metrics_server
+    if METRICS_PORT and metrics_server is None:
+        metrics_server = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+
+async def stop_metrics() -> None:
+    global metrics_server
+    if metrics_server is not None:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+        metrics_server = None
+
+def create_gopher_client() -> GopherClient:
+    """Gopher API client behind the shared circuit breaker"""
+    hedge_percentile = float(os.environ.get("GOPHER_HEDGE_PERCENTILE", "0.95"))
+    return GopherClient(
+        GOPHER_API_BASE,
+        GOPHER_API_TOKEN,
+        poll_concurrency=int(os.environ.get("GOPHER_POLL_CONCURRENCY", "20")),
+        breaker=gopher_breaker,
+        hedge_percentile=hedge_percentile if hedge_percentile > 0 else None
+    )
+
+async def post_init(application: Application) -> None:
+    """Create the shared Gopher API client once the application starts"""
+    global gopher_client, watches
+    gopher_client = create_gopher_client()
+    await start_metrics()
+    watches = WatchManager(
+        fetch=fetch_watched_items,
+        deliver=lambda chat_id, query, items: deliver_watch_results(application.bot, chat_id, query, items),
+        key_func=make_cache_key,
+        item_key=item_key,
+        path=WATCH_DB_PATH,
+        interval=WATCH_INTERVAL,
+        min_interval=WATCH_MIN_INTERVAL,
+        max_interval=WATCH_MAX_INTERVAL,
+        max_per_user=WATCH_MAX_PER_USER
+    )
+    watches.start()
+    task = asyncio.create_task(sweep_sessions())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def post_shutdown(application: Application) -> None:
+    """Close the shared Gopher API client on shutdown"""
+    global gopher_client
+    for task in list(background_tasks):
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    if watches is not None:
+        await watches.stop()
+    await stop_metrics()
+    await outbound.stop()
+    if gopher_client is not None:
+        await gopher_client.aclose()
+        gopher_client = None
+    search_states.close()
+    if work_queue is not None:
+        work_queue.close()
+    if archive is not None:
+        await asyncio.to_thread(archive.close)
+
+async def renew_job_lease(job_id: int, worker_name: str) -> None:
+    """Keep a job's lease alive while it runs, however long it waits for admission"""
+    while True:
+        await asyncio.sleep(work_queue.lease_seconds / 3)
+        if not await asyncio.to_thread(work_queue.renew, job_id, worker_name):
+            logger.warning("Lost the lease on search job %s", job_id)
+            return
+
+async def run_search_job(bot: Bot, job: tuple, slots: asyncio.Semaphore, worker_name: str) -> None:
+    """Run one queued search job and acknowledge it"""
+    job_id, payload, attempt = job
+    heartbeat = asyncio.create_task(renew_job_lease(job_id, worker_name))
+    try:
+        logger.info("Running search job %s (attempt %s)", job_id, attempt)
+        update = Update.de_json(json.loads(payload['update']), bot)
+        progress = ProgressTracker(outbound, update.message, message_id=payload.get('status_message_id'))
+        await execute_gopher_search(update, payload['state'], progress)
+        await asyncio.to_thread(work_queue.complete, job_id)
+    except Exception as e:
+        logger.error("Search job %s failed: %s", job_id, e, exc_info=True)
+        await asyncio.to_thread(work_queue.fail, job_id, str(e))
+    finally:
+        heartbeat.cancel()
+        slots.release()
+
+async def run_search_worker() -> None:
+    """Worker process loop: claim queued searches and run them with bounded concurrency"""
+    global gopher_client
+    worker_name = f"{socket.gethostname()}:{os.getpid()}"
+    slots = asyncio.Semaphore(WORKER_CONCURRENCY)
+    idle_delay = 0.05
     
-    # Create the Application
-    application = Application.builder().token(BOT_TOKEN).build()
+    async with Bot(BOT_TOKEN, base_url=TELEGRAM_API_BASE) as bot:
+        gopher_client = create_gopher_client()
+        await start_metrics()
+        logger.info("Search worker %s started", worker_name)
+        try:
+            while True:
+                await slots.acquire()
+                job = await asyncio.to_thread(work_queue.claim, worker_name)
+                if job is None:
+                    # Queue empty: back off up to one second between checks
+                    slots.release()
+                    await asyncio.sleep(idle_delay)
+                    idle_delay = min(idle_delay * 2, 1.0)
+                    continue
+                idle_delay = 0.05
+                task = asyncio.create_task(run_search_job(bot, job, slots, worker_name))
+                background_tasks.add(task)
+                task.add_done_callback(background_tasks.discard)
+        finally:
+            # Unfinished jobs keep their lease and are picked up again once it expires
+            for task in list(background_tasks):
+                task.cancel()
+            await asyncio.gather(*background_tasks, return_exceptions=True)
+            await stop_metrics()
+            await outbound.stop()
+            await gopher_client.aclose()
+            gopher_client = None
+            work_queue.close()
+            if archive is not None:
+                await asyncio.to_thread(archive.close)
+
+def build_application() -> Application:
+    """Create the Application and register all handlers"""
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .base_url(TELEGRAM_API_BASE)
+        .concurrent_updates(True)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
 
     # Command handlers
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("info", info_command))
     application.add_handler(CommandHandler("search", search_command))
+    application.add_handler(CommandHandler("multisearch", multisearch_command))
+    application.add_handler(CommandHandler("history", history_command))
+    application.add_handler(CommandHandler("find", find_command))
+    application.add_handler(CommandHandler("watch", watch_command))
+    application.add_handler(CommandHandler("unwatch", unwatch_command))
+    application.add_handler(CommandHandler("export", export_command))
     
-    # Callback query handler for button interactions
+    # Inline mode (@bot query), enabled for the bot with BotFather's /setinline
+    application.add_handler(InlineQueryHandler(inline_query_handler))
+    
+    # Callback query handlers for button interactions
+    application.add_handler(CallbackQueryHandler(results_page_callback, pattern=r"^page:\d+:\d+$"))
     application.add_handler(CallbackQueryHandler(search_type_button_callback))
     
     # Message handler for text messages
@@ -1110,13 +1344,52 @@ def main() -> None:
     
     # Unknown command handler
     application.add_handler(MessageHandler(filters.COMMAND, unknown_command))
+    
+    return application
+
+def main() -> None:
+    """Main function to run the bot"""
+    # Validate token
+    if BOT_TOKEN == "YOUR_BOT_TOKEN_HERE":
+        print("❌ Error: BOT TOKEN not set!")
+        print("Please set the TELEGRAM_BOT_TOKEN environment variable")
+        print("or replace the BOT_TOKEN variable in main.py")
+        return
+    
+    if BOT_ROLE == "worker":
+        print("🛠️ Search worker is starting...")
+        asyncio.run(run_search_worker())
+        return
+    
+    # Create the Application
+    application = build_application()
 
     # Run the bot
     print("🤖 Bot is starting...")
     print(f"📱 Bot Token: {BOT_TOKEN[:10]}...")
     
-    application.run_polling()
-    print("🔄 Bot is running with polling...")
+    if BOT_MODE == "webhook":
+        # Without it python-telegram-bot would register http://<listen>:<port>/<path> with Telegram
+        if not WEBHOOK_URL:
+            print("❌ Error: WEBHOOK_URL not set!")
+            print("Set it to the public HTTPS URL Telegram should post updates to,")
+            print("e.g. WEBHOOK_URL=https://bot.example.com/telegram")
+            return
+        secret_token = WEBHOOK_SECRET
+        if not secret_token:
+            secret_token = secrets.token_urlsafe(32)
+            print(f"🔑 WEBHOOK_SECRET not set, using this one for this run: {secret_token}")
+        print(f"🌐 Bot is running with webhook on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}...")
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            secret_token=secret_token,
+            webhook_url=WEBHOOK_URL
+        )
+    else:
+        print("🔄 Bot is running with polling...")
+        application.run_polling()
 
 if __name__ == "__main__":
     main()
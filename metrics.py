@@ -0,0 +1,175 @@
+import asyncio
+import bisect
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from a cached hit up to the search deadline
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Gauge:
+    """Point-in-time value read from a callback when metrics are scraped"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, function) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+
+    def samples(self):
+        try:
+            value = self.function()
+        except Exception as e:
+            logger.warning("Gauge %s failed: %s", self.name, e)
+            return
+        yield self.name, "", value
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sum += value
+
+    def time(self) -> '_Timer':
+        """Context manager observing the seconds spent inside it"""
+        return _Timer(self)
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self._counts):
+            cumulative += count
+            yield f"{self.name}_bucket", f'{{le="{_format_value(bound)}"}}', cumulative
+        yield f"{self.name}_sum", "", self._sum
+        yield f"{self.name}_count", "", cumulative
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: Histogram) -> None:
+        self.histogram = histogram
+
+    def __enter__(self) -> '_Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self) -> None:
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, function) -> Gauge:
+        return self._register(Gauge(name, documentation, function))
+
+    def histogram(self, name: str, documentation: str, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+async def _handle_scrape(reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                         registry: MetricsRegistry) -> None:
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        # Drain the headers; the request body (if any) is ignored
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b"\r\n", b"\n", b""):
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split('?')[0] == "/metrics":
+            status, content_type = "200 OK", "text/plain; version=0.0.4; charset=utf-8"
+            body = registry.render().encode('utf-8')
+        else:
+            status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+    except Exception as e:
+        logger.debug("Metrics scrape failed: %s", e)
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host: str, port: int, registry: MetricsRegistry = REGISTRY):
+    """Serve GET /metrics on host:port from the running event loop; returns the server"""
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle_scrape(reader, writer, registry), host, port
+    )
+    logger.info("Metrics available at http://%s:%s/metrics", host, port)
+    return server
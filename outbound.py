@@ -0,0 +1,322 @@
+import asyncio
+import heapq
+import itertools
+import logging
+
+from telegram.error import BadRequest, RetryAfter
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+SEND_SECONDS = REGISTRY.histogram(
+    "telegram_send_seconds", "Latency of outbound Telegram API calls"
+)
+
+# Lower value is sent first: final results jump ahead of chatter and progress updates
+PRIORITY_RESULT = 0
+PRIORITY_NORMAL = 1
+PRIORITY_PROGRESS = 2
+
+
+class TokenBucket:
+    """Token bucket refilled at rate tokens/second up to capacity"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'blocked_until')
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        """True if the bucket is full again and carries no state worth keeping"""
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+class _Outgoing:
+    __slots__ = ('chat_id', 'call', 'priority', 'seq', 'future', 'attempts')
+
+    def __init__(self, chat_id: int, call, priority: int, seq: int, future) -> None:
+        self.chat_id = chat_id
+        self.call = call
+        self.priority = priority
+        self.seq = seq
+        self.future = future
+        self.attempts = 0
+
+    def __lt__(self, other: '_Outgoing') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class OutboundScheduler:
+    """Central queue for every outbound Telegram call.
+
+    Calls are dispatched by priority (then arrival) under a global token bucket
+    (~30 msg/s) and one bucket per chat (~1 msg/s, 20 msg/min in groups).
+    A RetryAfter from Telegram pauses that chat for the requested time and puts
+    the call back in the queue at its original position.
+
+    The buckets live in this process. When several processes send with the same
+    bot token, each gets share (e.g. 1/N) of every limit so that together they stay
+    within Telegram's.
+    """
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, chat_burst: float = 3.0,
+                 group_rate: float = 20 / 60, group_burst: float = 3.0, max_attempts: int = 3,
+                 max_idle_buckets: int = 5000, share: float = 1.0) -> None:
+        self.global_rate = global_rate * share
+        self.chat_rate = chat_rate * share
+        self.chat_burst = max(1.0, chat_burst * share)
+        self.group_rate = group_rate * share
+        self.group_burst = max(1.0, group_burst * share)
+        self.max_attempts = max_attempts
+        self.max_idle_buckets = max_idle_buckets
+        self._heap = []
+        self._seq = itertools.count()
+        self._buckets = {}
+        self._global = None
+        self._wakeup = asyncio.Event()
+        self._tasks = set()
+        self._runner = None
+
+    def depth(self) -> int:
+        """Number of calls waiting to be sent"""
+        return len(self._heap)
+
+    def depth_by_priority(self) -> dict:
+        """Waiting calls per priority level"""
+        depths = {}
+        for item in self._heap:
+            depths[item.priority] = depths.get(item.priority, 0) + 1
+        return depths
+
+    async def send(self, chat_id: int, call, priority: int = PRIORITY_NORMAL):
+        """Queue call() (a coroutine factory) for chat_id and return its result once sent"""
+        loop = asyncio.get_running_loop()
+        if self._runner is None:
+            self._global = TokenBucket(self.global_rate, self.global_rate, loop.time())
+            self._runner = loop.create_task(self._run())
+        future = loop.create_future()
+        heapq.heappush(self._heap, _Outgoing(chat_id, call, priority, next(self._seq), future))
+        self._wakeup.set()
+        return await future
+
+    def _bucket(self, chat_id: int, now: float) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            # Negative chat ids are groups and channels, which Telegram limits harder
+            if chat_id < 0:
+                bucket = TokenBucket(self.group_rate, self.group_burst, now)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst, now)
+            self._buckets[chat_id] = bucket
+        return bucket
+
+    def _pop_ready(self, now: float):
+        """Pop the best call whose chat may send now; else return (None, seconds to wait)"""
+        skipped = []
+        blocked_chats = set()
+        wait = None
+        ready = None
+        while self._heap:
+            item = heapq.heappop(self._heap)
+            if item.future.done():
+                # Caller gave up (cancelled), drop it
+                continue
+            if item.chat_id in blocked_chats:
+                skipped.append(item)
+                continue
+            chat_wait = self._bucket(item.chat_id, now).wait_time(now)
+            if chat_wait <= 0:
+                ready = item
+                break
+            blocked_chats.add(item.chat_id)
+            skipped.append(item)
+            wait = chat_wait if wait is None else min(wait, chat_wait)
+        for item in skipped:
+            heapq.heappush(self._heap, item)
+        return ready, wait
+
+    async def _sleep(self, seconds: float) -> None:
+        """Sleep, waking early when new calls are queued"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            now = loop.time()
+            global_wait = self._global.wait_time(now)
+            if global_wait > 0:
+                await asyncio.sleep(global_wait)
+                continue
+
+            item, wait = self._pop_ready(now)
+            if item is None:
+                if wait is not None:
+                    await self._sleep(wait)
+                continue
+
+            self._global.consume(now)
+            self._bucket(item.chat_id, now).consume(now)
+            task = loop.create_task(self._deliver(item))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+            if len(self._buckets) > self.max_idle_buckets:
+                for chat_id in [c for c, b in self._buckets.items() if b.idle(now)]:
+                    del self._buckets[chat_id]
+
+    async def _deliver(self, item: _Outgoing) -> None:
+        try:
+            with SEND_SECONDS.time():
+                result = await item.call()
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            delay = retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+            loop = asyncio.get_running_loop()
+            self._bucket(item.chat_id, loop.time()).blocked_until = loop.time() + delay
+            item.attempts += 1
+            logger.warning("Flood control for chat %s, retrying in %.1fs (attempt %s)",
+                           item.chat_id, delay, item.attempts)
+            if item.attempts < self.max_attempts and not item.future.done():
+                heapq.heappush(self._heap, item)
+                self._wakeup.set()
+            elif not item.future.done():
+                item.future.set_exception(e)
+        except Exception as e:
+            if not item.future.done():
+                item.future.set_exception(e)
+        else:
+            if not item.future.done():
+                item.future.set_result(result)
+
+    async def stop(self) -> None:
+        """Stop dispatching and cancel every queued call"""
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for item in self._heap:
+            if not item.future.done():
+                item.future.cancel()
+        self._heap.clear()
+
+
+class ProgressTracker:
+    """One status message per search, edited in place instead of replying per step.
+
+    update() is debounced to at most one edit per min_interval seconds (only the
+    latest text is shown) and finish() turns the status message into the final
+    text, typically the first page of results.
+    """
+
+    def __init__(self, scheduler: OutboundScheduler, message, message_id: int = None,
+                 min_interval: float = 2.0) -> None:
+        self.scheduler = scheduler
+        self.message = message
+        self.chat_id = message.chat_id
+        self.message_id = message_id
+        self.min_interval = min_interval
+        self._shown_text = None
+        self._pending_text = None
+        self._last_edit = 0.0
+        self._flush_task = None
+
+    async def start(self, text: str) -> None:
+        """Send the status message as a reply to the user's message"""
+        status = await self.scheduler.send(
+            self.chat_id,
+            lambda: self.message.reply_text(text),
+            PRIORITY_NORMAL
+        )
+        self.message_id = status.message_id
+        self._shown_text = text
+        self._last_edit = asyncio.get_running_loop().time()
+
+    def update(self, text: str) -> None:
+        """Show text on the status message soon; newer updates replace pending ones"""
+        self._pending_text = text
+        if self._flush_task is None and self.message_id is not None:
+            loop = asyncio.get_running_loop()
+            delay = max(0.0, self._last_edit + self.min_interval - loop.time())
+            self._flush_task = loop.create_task(self._flush(delay))
+
+    async def _flush(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        text, self._pending_text = self._pending_text, None
+        self._last_edit = asyncio.get_running_loop().time()
+        # _flush_task stays set while the edit waits in the scheduler, so finish() can
+        # cancel it there instead of letting it land on top of the final text
+        try:
+            await self._edit(text, PRIORITY_PROGRESS)
+        except Exception as e:
+            logger.warning("Progress edit in chat %s failed: %s", self.chat_id, e)
+        finally:
+            if self._flush_task is asyncio.current_task():
+                self._flush_task = None
+        if self._pending_text is not None:
+            # Updates that arrived while this edit was queued
+            self.update(self._pending_text)
+
+    async def _edit(self, text: str, priority: int, **kwargs):
+        if text == self._shown_text and not kwargs:
+            return None
+        bot = self.message.get_bot()
+        try:
+            result = await self.scheduler.send(
+                self.chat_id,
+                lambda: bot.edit_message_text(text, chat_id=self.chat_id, message_id=self.message_id, **kwargs),
+                priority
+            )
+        except BadRequest as e:
+            if "not modified" not in str(e).lower():
+                raise
+            result = None
+        self._shown_text = text
+        return result
+
+    async def finish(self, text: str, **kwargs):
+        """Replace the status message with the final text (a new reply if there is none)"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self._pending_text = None
+
+        if self.message_id is not None:
+            try:
+                return await self._edit(text, PRIORITY_RESULT, **kwargs)
+            except BadRequest as e:
+                # Status message deleted or too old to edit: fall back to a new reply
+                logger.warning("Could not edit status message in chat %s: %s", self.chat_id, e)
+        return await self.scheduler.send(
+            self.chat_id,
+            lambda: self.message.reply_text(text, **kwargs),
+            PRIORITY_RESULT
+        )
@@ -0,0 +1,174 @@
+import itertools
+import time
+
+from result_model import ProfileRecord, TrendRecord, TweetRecord
+
+# Telegram measures message length in UTF-16 code units, not Python characters
+MESSAGE_LIMIT = 4096
+CONTENT_LIMIT = 300
+
+RULE = "=" * 40 + "\n\n"
+SEPARATOR = "\n" + "-" * 40 + "\n\n"
+
+
+def utf16_len(text: str) -> int:
+    """Length of text as Telegram counts it"""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def _date_line(created_at: int) -> str:
+    return f"   📅 {time.strftime('%Y-%m-%d %H:%M', time.gmtime(created_at))} UTC\n"
+
+
+def render_tweet(append, i: int, record: TweetRecord) -> None:
+    """Template for tweets and other posts"""
+    content = record.content
+    if content:
+        if len(content) > CONTENT_LIMIT:
+            append(f"[{i}] {content[:CONTENT_LIMIT]}...\n\n")
+        else:
+            append(f"[{i}] {content}\n\n")
+    else:
+        append(f"[{i}] (No content)\n\n")
+
+    username = record.username
+    if username:
+        append(f"   👤 @{username}\n")
+
+    if record.created_at is not None:
+        append(_date_line(record.created_at))
+
+    likes = record.likes
+    retweets = record.retweets
+    replies = record.replies
+    quotes = record.quotes
+    if likes > 0 or retweets > 0 or replies > 0:
+        metrics = []
+        if likes > 0:
+            metrics.append(f"❤️ {likes}")
+        if retweets > 0:
+            metrics.append(f"🔄 {retweets}")
+        if replies > 0:
+            metrics.append(f"💬 {replies}")
+        if quotes > 0:
+            metrics.append(f"📝 {quotes}")
+        append("   📊 " + " | ".join(metrics) + "\n")
+
+    if record.id and username:
+        append(f"   🔗 https://twitter.com/{username}/status/{record.id}\n")
+    elif record.item_id:
+        append(f"   🆔 ID: {record.item_id}\n")
+
+    append(SEPARATOR)
+
+
+def render_profile(append, i: int, record: ProfileRecord) -> None:
+    """Template for accounts (profiles, followers, following, retweeters)"""
+    username = record.username
+    name = record.name
+    if name and username:
+        append(f"[{i}] 👤 {name} (@{username})\n")
+    elif username:
+        append(f"[{i}] 👤 @{username}\n")
+    else:
+        append(f"[{i}] 👤 {name}\n")
+
+    if record.description:
+        append(f"   📝 {record.description[:CONTENT_LIMIT]}\n")
+
+    stats = []
+    if record.followers is not None:
+        stats.append(f"👥 {record.followers} followers")
+    if record.following is not None:
+        stats.append(f"➕ {record.following} following")
+    if record.posts is not None:
+        stats.append(f"📝 {record.posts} posts")
+    if stats:
+        append("   " + " | ".join(stats) + "\n")
+
+    if username:
+        append(f"   🔗 https://twitter.com/{username}\n")
+    append(SEPARATOR)
+
+
+def render_trend(append, i: int, record: TrendRecord) -> None:
+    """Compact one-line template for trends"""
+    if record.volume:
+        append(f"[{i}] 📈 {record.name} — {record.volume} posts\n")
+    else:
+        append(f"[{i}] 📈 {record.name}\n")
+
+
+TEMPLATES = {
+    TweetRecord: render_tweet,
+    ProfileRecord: render_profile,
+    TrendRecord: render_trend,
+}
+
+
+def render_items(records, start: int = 1) -> list:
+    """Render each record into one text block with its record type's template"""
+    blocks = []
+    for i, record in enumerate(records, start):
+        parts = []
+        TEMPLATES[type(record)](parts.append, i, record)
+        blocks.append("".join(parts))
+    return blocks
+
+
+def split_text(text: str, limit: int = MESSAGE_LIMIT) -> list:
+    """Split plain text into pieces of at most limit UTF-16 units, preferring line breaks"""
+    pieces = []
+    pos = 0
+    while pos < len(text):
+        end = min(len(text), pos + limit)
+        # Characters outside the BMP take two units; shrink until the piece fits
+        while utf16_len(text[pos:end]) > limit:
+            end -= max(1, (utf16_len(text[pos:end]) - limit) // 2)
+        if end < len(text):
+            newline = text.rfind("\n", pos, end)
+            if newline > pos + (end - pos) // 2:
+                end = newline + 1
+        pieces.append(text[pos:end])
+        pos = end
+    return pieces
+
+
+def pack_chunks(head: str, blocks: list, limit: int = MESSAGE_LIMIT) -> list:
+    """Pack head and item blocks into messages without splitting an item across messages"""
+    chunks = []
+    parts = []
+    size = 0
+    for block in itertools.chain((head,), blocks):
+        block_size = utf16_len(block)
+        if size + block_size > limit and size > 0:
+            chunks.append("".join(parts))
+            parts = []
+            size = 0
+        if block_size > limit:
+            # A single oversized item still has to be cut
+            pieces = split_text(block, limit)
+            chunks.extend(pieces[:-1])
+            block = pieces[-1]
+            block_size = utf16_len(block)
+        parts.append(block)
+        size += block_size
+    if parts and size > 0:
+        chunks.append("".join(parts))
+    return chunks
+
+
+
+def fit_blocks(head: str, blocks, per_page: int, limit: int = MESSAGE_LIMIT) -> list:
+    """The leading blocks, at most per_page and at least one, that fit in one message after head.
+
+    blocks may be a lazy iterable: it is consumed only up to the first block that does not fit.
+    """
+    size = utf16_len(head)
+    page = []
+    for block in itertools.islice(blocks, per_page):
+        size += utf16_len(block)
+        if page and size > limit:
+            break
+        page.append(block)
+    return page
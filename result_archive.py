@@ -0,0 +1,209 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+from result_model import TweetRecord, parse_id, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS items ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+    "item_id TEXT, "
+    "tweet_id TEXT, "
+    "platform TEXT, "
+    "search_type TEXT, "
+    "query TEXT, "
+    "username TEXT, "
+    "content TEXT, "
+    "created_at TEXT, "
+    "public_metrics TEXT, "
+    "fetched_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS items_tweet ON items (tweet_id)",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5("
+    "content, username, query, content='items', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_insert AFTER INSERT ON items BEGIN "
+    "INSERT INTO items_fts (rowid, content, username, query) "
+    "VALUES (new.id, new.content, new.username, new.query); END",
+    "CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN "
+    "INSERT INTO items_fts (items_fts, rowid, content, username, query) "
+    "VALUES ('delete', old.id, old.content, old.username, old.query); END",
+    "CREATE TABLE IF NOT EXISTS searches ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+    "user_id INTEGER, "
+    "platform TEXT, "
+    "search_type TEXT, "
+    "query TEXT, "
+    "item_count INTEGER, "
+    "searched_at REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS searches_user ON searches (user_id, searched_at)",
+)
+
+# One row per tweet (or per item without a tweet ID): refetching a tweet only refreshes its counts
+_ITEM_KEY = "COALESCE(tweet_id, item_id)"
+_CREATE_ITEM_KEY = f"CREATE UNIQUE INDEX IF NOT EXISTS items_key ON items ({_ITEM_KEY})"
+# Archives written before items_key existed hold repeats; keep the first copy of each
+_DEDUPE_ITEMS = (
+    f"DELETE FROM items WHERE {_ITEM_KEY} IS NOT NULL AND id NOT IN "
+    f"(SELECT MIN(id) FROM items WHERE {_ITEM_KEY} IS NOT NULL GROUP BY {_ITEM_KEY})"
+)
+_INSERT_ITEM = (
+    "INSERT INTO items (item_id, tweet_id, platform, search_type, query, username, content, "
+    "created_at, public_metrics, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    f"ON CONFLICT ({_ITEM_KEY}) DO UPDATE SET "
+    "public_metrics = COALESCE(excluded.public_metrics, public_metrics), fetched_at = excluded.fetched_at"
+)
+_INSERT_SEARCH = (
+    "INSERT INTO searches (user_id, platform, search_type, query, item_count, searched_at) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+_STOP = object()
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching all words (no operators)"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class ResultArchive:
+    """SQLite archive of fetched items, one row per tweet, full-text indexed with FTS5.
+
+    archive_items() and record_search() only queue rows; a writer thread inserts
+    them in batches of up to batch_size, at least every flush_interval seconds.
+    Reads use their own connection and are meant to run via asyncio.to_thread.
+    """
+
+    def __init__(self, path: str = "archive.db", batch_size: int = 500, flush_interval: float = 1.0,
+                 max_pending: int = 100000) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._queue = queue.Queue()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        if not self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'items_key'").fetchone():
+            self._db.execute(_DEDUPE_ITEMS)
+            self._db.execute(_CREATE_ITEM_KEY)
+        self._db.commit()
+        self._read_lock = threading.Lock()
+        self._reader = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._writer = threading.Thread(target=self._write_loop, name="result-archive", daemon=True)
+        self._writer.start()
+
+    def _put(self, kind: str, rows: list) -> None:
+        if self._queue.qsize() >= self.max_pending:
+            self.dropped += len(rows)
+            logger.warning("Archive writer behind, dropped %s rows (%s total)", len(rows), self.dropped)
+            return
+        self._queue.put((kind, rows))
+
+    def archive_items(self, platform: str, search_type: str, query: str, items: list) -> None:
+        """Queue fetched items for the archive"""
+        now = time.time()
+        rows = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            metadata = item.get('metadata') or {}
+            public_metrics = metadata.get('public_metrics')
+            rows.append((
+                item.get('id'),
+                metadata.get('tweet_id') or metadata.get('id'),
+                platform,
+                search_type,
+                query,
+                metadata.get('username'),
+                item.get('content') or item.get('text', ''),
+                metadata.get('created_at'),
+                json.dumps(public_metrics) if public_metrics else None,
+                now
+            ))
+        if rows:
+            self._put('item', rows)
+
+    def record_search(self, user_id: int, platform: str, search_type: str, query: str, item_count: int) -> None:
+        """Queue one line of a user's search history"""
+        self._put('search', [(user_id, platform, search_type, query, item_count, time.time())])
+
+    def _write_loop(self) -> None:
+        while True:
+            try:
+                first = self._queue.get()
+            except Exception:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            rows = len(first[1]) if first is not _STOP else 0
+            # Gather more rows until the batch is full or the flush interval is up
+            while first is not _STOP and rows < self.batch_size:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                batch.append(entry)
+                if entry is _STOP:
+                    break
+                rows += len(entry[1])
+
+            items = [row for entry in batch if entry is not _STOP and entry[0] == 'item' for row in entry[1]]
+            searches = [row for entry in batch if entry is not _STOP and entry[0] == 'search' for row in entry[1]]
+            try:
+                with self._db:
+                    if items:
+                        self._db.executemany(_INSERT_ITEM, items)
+                    if searches:
+                        self._db.executemany(_INSERT_SEARCH, searches)
+            except sqlite3.Error as e:
+                logger.error("Archive write of %s rows failed: %s", len(items) + len(searches), e)
+            if any(entry is _STOP for entry in batch):
+                return
+
+    def history(self, user_id: int, limit: int = 10) -> list:
+        """The user's most recent searches as (search_type, query, item_count, searched_at)"""
+        with self._read_lock:
+            return self._reader.execute(
+                "SELECT search_type, query, item_count, searched_at FROM searches "
+                "WHERE user_id = ? ORDER BY searched_at DESC LIMIT ?",
+                (user_id, limit)
+            ).fetchall()
+
+    def find(self, text: str, limit: int = 50) -> list:
+        """TweetRecords of archived items matching every word of text, best match first, one per tweet"""
+        match = fts_query(text)
+        if not match:
+            return []
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT items.item_id, items.tweet_id, items.username, items.content, "
+                "items.created_at, items.public_metrics "
+                "FROM items_fts JOIN items ON items.id = items_fts.rowid "
+                "WHERE items_fts MATCH ? ORDER BY items_fts.rank LIMIT ?",
+                (match, limit)
+            ).fetchall()
+
+        found = []
+        for item_id, tweet_id, username, content, created_at, public_metrics in rows:
+            counts = json.loads(public_metrics) if public_metrics else {}
+            found.append(TweetRecord(
+                parse_id(tweet_id), content or "", username or "", parse_timestamp(created_at),
+                counts.get('like_count', 0), counts.get('retweet_count', 0),
+                counts.get('reply_count', 0), counts.get('quote_count', 0), parse_id(item_id)
+            ))
+        return found
+
+    def close(self) -> None:
+        """Flush queued rows and close the database"""
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._db.close()
+        with self._read_lock:
+            self._reader.close()
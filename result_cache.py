@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Freshness per search type (seconds): trends move fast, profiles and single tweets barely change
+DEFAULT_TTLS = {
+    'gettrends': 120,
+    'getspace': 120,
+    'searchbyquery': 300,
+    'getreplies': 300,
+    'getretweeters': 300,
+    'gettweets': 600,
+    'getmedia': 600,
+    'searchbyfullarchive': 900,
+    'getfollowers': 1800,
+    'getfollowing': 1800,
+    'getbyid': 3600,
+    'searchbyprofile': 3600,
+    'getprofile': 3600,
+    'getprofilebyid': 3600,
+}
+
+
+def make_cache_key(search_data: dict) -> tuple:
+    """Normalized (platform, search type, query, max_results) key of a search request"""
+    arguments = search_data['arguments']
+    query = " ".join(str(arguments.get('query', '')).split()).casefold()
+    return (
+        search_data['type'],
+        arguments['type'],
+        query,
+        arguments.get('max_results')
+    )
+
+
+class _CacheEntry:
+    __slots__ = ('value', 'size', 'stored_at', 'fresh_until', 'stale_until', 'keep_until', 'refreshing')
+
+    def __init__(self, value, size: int, stored_at: float, fresh_until: float, stale_until: float,
+                 keep_until: float) -> None:
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.keep_until = keep_until
+        self.refreshing = False
+
+
+class ResultCache:
+    """Bounded in-process TTL + LRU cache of completed search results.
+
+    Entries are fresh for their search type's TTL and may then be served stale
+    for another stale_factor * TTL while a single background refresh runs.
+    Expired entries are kept for fallback_ttl more seconds so get_fallback() can
+    still answer while the upstream API is down.
+    Eviction is least-recently-used, bounded by entry count and total bytes.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024,
+                 ttls: dict = None, default_ttl: float = 300, stale_factor: float = 1.0,
+                 fallback_ttl: float = 24 * 3600) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.stale_factor = stale_factor
+        self.fallback_ttl = fallback_ttl
+        self.total_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        """True if get(key) would return a result (fresh or stale); does not touch stats or order"""
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() < entry.stale_until
+
+    def get(self, key):
+        """Return (value, is_stale), or None if the key is missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        if now >= entry.stale_until:
+            if now >= entry.keep_until:
+                self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        if now < entry.fresh_until:
+            self.hits += 1
+            return entry.value, False
+        self.stale_hits += 1
+        return entry.value, True
+
+    def set(self, key, value, size: int) -> None:
+        """Store a result; key[1] is the search type used to pick the TTL"""
+        if size > self.max_bytes:
+            logger.info("Result for %s too large to cache (%s bytes)", key, size)
+            return
+
+        ttl = self.ttls.get(key[1], self.default_ttl)
+        now = time.monotonic()
+        if key in self._entries:
+            self._remove(key)
+        stale_until = now + ttl * (1 + self.stale_factor)
+        self._entries[key] = _CacheEntry(value, size, now, now + ttl, stale_until, stale_until + self.fallback_ttl)
+        self.total_bytes += size
+
+        # Evict least recently used entries until both bounds hold
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+
+    def get_fallback(self, key):
+        """Return (value, age in seconds) even if expired, or None; for use when upstream is down"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if now >= entry.keep_until:
+            self._remove(key)
+            return None
+        return entry.value, now - entry.stored_at
+
+    def begin_refresh(self, key) -> bool:
+        """Claim the background refresh of a stale entry; False if one is already running"""
+        entry = self._entries.get(key)
+        if entry is None or entry.refreshing:
+            return False
+        entry.refreshing = True
+        return True
+
+    def end_refresh(self, key) -> None:
+        """Release a refresh claimed with begin_refresh (set() replaces the entry on success)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.refreshing = False
+
+    def _remove(self, key) -> None:
+        entry = self._entries.pop(key)
+        self.total_bytes -= entry.size
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key onto one in-flight task"""
+
+    def __init__(self) -> None:
+        self._inflight = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    def __contains__(self, key) -> bool:
+        return key in self._inflight
+
+    async def do(self, key, factory):
+        """Await factory() for the first caller of key; later callers share its outcome"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        # Shield so one impatient caller being cancelled does not cancel everyone's search
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,207 @@
+import sys
+from datetime import datetime, timezone
+
+# Search types whose items are accounts rather than posts
+PROFILE_SEARCH_TYPES = (
+    'getprofile', 'getprofilebyid', 'searchbyprofile', 'getfollowers', 'getfollowing', 'getretweeters'
+)
+
+
+def parse_timestamp(value) -> int:
+    """Epoch seconds of an ISO 8601 or Twitter-style date, or None"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00', 1))
+    except ValueError:
+        pass
+    else:
+        # Timestamps without an offset are UTC, not the server's local time
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp())
+    try:
+        # "Wed Oct 10 20:19:24 +0000 2018"
+        return int(datetime.strptime(value, "%a %b %d %H:%M:%S %z %Y").timestamp())
+    except ValueError:
+        return None
+
+
+def parse_id(value):
+    """Numeric IDs as ints (a 19-digit str takes more than twice the memory), others as given"""
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return value
+
+
+def _count(value) -> int:
+    return value if isinstance(value, int) else 0
+
+
+def _name(value) -> str:
+    # Usernames repeat across pages and searches; keep one copy of each
+    return sys.intern(value) if isinstance(value, str) and value else ""
+
+
+class TweetRecord:
+    """A post, reduced to what the bot shows.
+
+    id is the tweet ID from the metadata (None if the API sent none) and the only one
+    a status link is built from; item_id is the result item's own ID.
+    """
+
+    __slots__ = ('id', 'content', 'username', 'created_at', 'likes', 'retweets', 'replies', 'quotes',
+                 'item_id')
+    kind = 'tweet'
+
+    def __init__(self, id, content: str, username: str, created_at: int,
+                 likes: int = 0, retweets: int = 0, replies: int = 0, quotes: int = 0,
+                 item_id=None) -> None:
+        self.id = id
+        self.content = content
+        self.username = username
+        self.created_at = created_at
+        self.likes = likes
+        self.retweets = retweets
+        self.replies = replies
+        self.quotes = quotes
+        self.item_id = item_id
+
+    @classmethod
+    def from_item(cls, item: dict) -> 'TweetRecord':
+        metadata = item.get('metadata') or {}
+        public_metrics = metadata.get('public_metrics') or {}
+        tweet_id = parse_id(metadata.get('tweet_id') or metadata.get('id'))
+        item_id = parse_id(item.get('id'))
+        if item_id == tweet_id:
+            # Usually the same ID; keep one object for both
+            item_id = tweet_id
+        return cls(
+            tweet_id,
+            item.get('content') or item.get('text') or "",
+            _name(metadata.get('username')),
+            parse_timestamp(metadata.get('created_at')),
+            _count(public_metrics.get('like_count')),
+            _count(public_metrics.get('retweet_count')),
+            _count(public_metrics.get('reply_count')),
+            _count(public_metrics.get('quote_count')),
+            item_id,
+        )
+
+    @property
+    def key(self):
+        """Tweet ID, or the item ID for posts without one"""
+        return self.id or self.item_id
+
+    def to_row(self) -> list:
+        return [self.kind, self.id, self.content, self.username, self.created_at,
+                self.likes, self.retweets, self.replies, self.quotes, self.item_id]
+
+
+class ProfileRecord:
+    """An account (profiles, followers, following, retweeters); unknown counts are None"""
+
+    __slots__ = ('id', 'username', 'name', 'description', 'followers', 'following', 'posts')
+    kind = 'profile'
+
+    def __init__(self, id, username: str, name: str, description: str,
+                 followers: int = None, following: int = None, posts: int = None) -> None:
+        self.id = id
+        self.username = username
+        self.name = name
+        self.description = description
+        self.followers = followers
+        self.following = following
+        self.posts = posts
+
+    @classmethod
+    def from_item(cls, item: dict) -> 'ProfileRecord':
+        profile = item.get('metadata') or item
+        counts = profile.get('public_metrics') or profile
+        return cls(
+            parse_id(profile.get('id') or profile.get('user_id') or item.get('id')),
+            _name(profile.get('username') or profile.get('screen_name')),
+            profile.get('name') or "",
+            profile.get('description') or profile.get('biography') or item.get('content') or "",
+            counts.get('followers_count'),
+            counts.get('following_count') or counts.get('friends_count'),
+            counts.get('tweet_count') or counts.get('statuses_count'),
+        )
+
+    def to_row(self) -> list:
+        return [self.kind, self.id, self.username, self.name, self.description,
+                self.followers, self.following, self.posts]
+
+
+class TrendRecord:
+    """A trending topic"""
+
+    __slots__ = ('name', 'volume')
+    kind = 'trend'
+
+    def __init__(self, name: str, volume: int = None) -> None:
+        self.name = name
+        self.volume = volume
+
+    @classmethod
+    def from_item(cls, item: dict) -> 'TrendRecord':
+        metadata = item.get('metadata') or {}
+        return cls(
+            item.get('name') or item.get('query') or item.get('content') or item.get('text'),
+            item.get('tweet_volume') or metadata.get('tweet_volume'),
+        )
+
+    @property
+    def id(self):
+        return self.name
+
+    def to_row(self) -> list:
+        return [self.kind, self.name, self.volume]
+
+
+RECORD_TYPES = {record.kind: record for record in (TweetRecord, ProfileRecord, TrendRecord)}
+
+
+def parse_item(search_type: str, item):
+    """The record for one raw result item, or None if it is not an object"""
+    if not isinstance(item, dict):
+        return None
+    if search_type in PROFILE_SEARCH_TYPES:
+        profile = item.get('metadata') or item
+        # Items without a name are shown as posts
+        if profile.get('username') or profile.get('screen_name') or profile.get('name'):
+            return ProfileRecord.from_item(item)
+    elif search_type == 'gettrends':
+        if item.get('name') or item.get('query') or item.get('content') or item.get('text'):
+            return TrendRecord.from_item(item)
+    return TweetRecord.from_item(item)
+
+
+def parse_items(search_type: str, items: list) -> list:
+    """Records for a search result's items, parsed once when the result arrives"""
+    records = []
+    for item in items:
+        record = parse_item(search_type, item)
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def record_from_row(row: list):
+    """Inverse of to_row(), for records stored as JSON"""
+    return RECORD_TYPES[row[0]](*row[1:])
+
+
+def records_nbytes(records: list) -> int:
+    """Estimated memory held by a list of records, for charging them to the result cache"""
+    total = sys.getsizeof(records)
+    for record in records:
+        total += sys.getsizeof(record)
+        for slot in record.__slots__:
+            value = getattr(record, slot)
+            # Small ints and None are shared; strings and large IDs are per record
+            if isinstance(value, str) or (isinstance(value, int) and not -5 <= value <= 256):
+                total += sys.getsizeof(value)
+    return total
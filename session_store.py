@@ -0,0 +1,197 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """Per-user search session storage with TTL expiry and a size bound.
+
+    Sessions expire ttl seconds after they were last written. Expired entries
+    are dropped lazily on access and in bulk by sweep(). When more than
+    max_size sessions exist the least recently written ones are evicted.
+    Stores with blocking = True do disk I/O in every call; run those calls
+    via asyncio.to_thread rather than on the event loop.
+    """
+
+    blocking = False
+
+    def __init__(self, ttl: float = 900, max_size: int = 10000) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+
+    @abstractmethod
+    def get(self, user_id: int):
+        """Return the user's session dict, or None if missing or expired"""
+
+    @abstractmethod
+    def set(self, user_id: int, state: dict) -> None:
+        """Store (or replace) the user's session and restart its TTL"""
+
+    @abstractmethod
+    def delete(self, user_id: int) -> None:
+        """Remove the user's session if present"""
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Drop every expired session; returns how many were removed"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored sessions, expired ones included until swept"""
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.get(user_id) is not None
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """In-process session store (lost on restart)"""
+
+    def __init__(self, ttl: float = 900, max_size: int = 10000) -> None:
+        super().__init__(ttl, max_size)
+        self._sessions = OrderedDict()
+
+    def get(self, user_id: int):
+        item = self._sessions.get(user_id)
+        if item is None:
+            return None
+        expires_at, state = item
+        if time.monotonic() >= expires_at:
+            del self._sessions[user_id]
+            return None
+        return state
+
+    def set(self, user_id: int, state: dict) -> None:
+        self._sessions[user_id] = (time.monotonic() + self.ttl, state)
+        self._sessions.move_to_end(user_id)
+        while len(self._sessions) > self.max_size:
+            self._sessions.popitem(last=False)
+
+    def delete(self, user_id: int) -> None:
+        self._sessions.pop(user_id, None)
+
+    def sweep(self) -> int:
+        # Entries are ordered by last write and share one TTL, so expired ones sit at the front
+        now = time.monotonic()
+        removed = 0
+        while self._sessions:
+            user_id, (expires_at, _) = next(iter(self._sessions.items()))
+            if expires_at > now:
+                break
+            del self._sessions[user_id]
+            removed += 1
+        return removed
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Session store persisted in a SQLite file, so sessions survive restarts.
+
+    Several stores (and processes) can share one file by using different tables.
+    encode/decode convert values that are not plain JSON to and from JSON-able form.
+    The session count is kept in memory instead of counted on every write.
+    Each process only sees its own writes between recounts, so a table shared
+    by several processes can exceed max_size until the next sweep().
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = "sessions.db", ttl: float = 900, max_size: int = 10000,
+                 table: str = "sessions", encode=None, decode=None) -> None:
+        super().__init__(ttl, max_size)
+        self.path = path
+        self.table = table
+        self.encode = encode
+        self.decode = decode
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "user_id INTEGER PRIMARY KEY, "
+            "state TEXT NOT NULL, "
+            "expires_at REAL NOT NULL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_expires_at ON {table} (expires_at)")
+        self._count = 0
+        removed = self.sweep()
+        logger.info("SQLite session store ready (%s:%s, %s sessions, %s expired removed)",
+                    path, table, len(self), removed)
+
+    def get(self, user_id: int):
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT state FROM {self.table} WHERE user_id = ? AND expires_at > ?",
+                (user_id, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        state = json.loads(row[0])
+        return self.decode(state) if self.decode is not None else state
+
+    def set(self, user_id: int, state: dict) -> None:
+        if self.encode is not None:
+            state = self.encode(state)
+        data = json.dumps(state)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            if not self._db.execute(
+                f"UPDATE {self.table} SET state = ?, expires_at = ? WHERE user_id = ?",
+                (data, expires_at, user_id)
+            ).rowcount:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (user_id, state, expires_at) VALUES (?, ?, ?)",
+                    (user_id, data, expires_at)
+                )
+                self._count += 1
+            if self._count > self.max_size:
+                self._evict()
+
+    def delete(self, user_id: int) -> None:
+        with self._lock:
+            self._count -= self._db.execute(f"DELETE FROM {self.table} WHERE user_id = ?", (user_id,)).rowcount
+
+    def sweep(self) -> int:
+        with self._lock:
+            removed = self._db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),)).rowcount
+            self._evict()
+        return removed
+
+    def _evict(self) -> None:
+        """Recount and drop the least recently written sessions over max_size (lock held)"""
+        self._count = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if self._count > self.max_size:
+            # All sessions share one TTL, so the soonest to expire are the least recently written
+            self._count -= self._db.execute(
+                f"DELETE FROM {self.table} WHERE user_id IN "
+                f"(SELECT user_id FROM {self.table} ORDER BY expires_at LIMIT ?)",
+                (self._count - self.max_size,)
+            ).rowcount
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def create_session_store(backend: str = "memory", path: str = "sessions.db", ttl: float = 900,
+                         max_size: int = 10000, table: str = "sessions", encode=None, decode=None) -> SessionStore:
+    """Build the session store selected by name ('memory' or 'sqlite'); values in memory are kept as-is"""
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, ttl=ttl, max_size=max_size, table=table, encode=encode, decode=decode)
+    if backend == "memory":
+        return MemorySessionStore(ttl=ttl, max_size=max_size)
+    raise ValueError(f"Unknown session backend: {backend}")
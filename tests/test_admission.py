@@ -0,0 +1,67 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from admission import AdmissionController  # noqa: E402
+from gopher_client import GopherSearchError  # noqa: E402
+
+
+def test_background_searches_skip_user_quota_but_respect_lane_limit():
+    async def run():
+        admission = AdmissionController(max_concurrent=20, per_user=2, max_queued_per_user=10,
+                                        background_limit=5)
+        peak = 0
+
+        async def refresh():
+            nonlocal peak
+            async with admission.admit(None, 'searchbyquery', background=True):
+                peak = max(peak, admission.running())
+                await asyncio.sleep(0.01)
+
+        results = await asyncio.gather(*(refresh() for _ in range(30)), return_exceptions=True)
+        return [r for r in results if isinstance(r, Exception)], peak
+
+    errors, peak = asyncio.run(run())
+    assert errors == []
+    assert peak == 5
+
+
+def test_user_searches_go_before_background():
+    async def run():
+        admission = AdmissionController(max_concurrent=1, per_user=1)
+        order = []
+        blocker = await admission.acquire('a', 'searchbyquery')
+
+        async def search(user, background):
+            async with admission.admit(user, 'searchbyquery', background=background):
+                order.append(user)
+
+        tasks = [asyncio.create_task(search('refresh', True)), asyncio.create_task(search('b', False))]
+        await asyncio.sleep(0)
+        admission.release('a', blocker)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(run()) == ['b', 'refresh']
+
+
+def test_check_rejects_only_users_over_their_queue_limit():
+    async def run():
+        admission = AdmissionController(max_concurrent=1, per_user=1, max_queued_per_user=2)
+        holder = asyncio.create_task(admission.acquire('a', 'searchbyquery'))
+        waiters = [asyncio.create_task(admission.acquire('a', 'searchbyquery')) for _ in range(2)]
+        await asyncio.sleep(0)
+        rejected = []
+        for user, background in (('a', False), ('a', True), ('b', False)):
+            try:
+                admission.check(user, background)
+            except GopherSearchError as e:
+                rejected.append((user, background, e.kind))
+        for task in waiters:
+            task.cancel()
+        await asyncio.gather(holder, *waiters, return_exceptions=True)
+        return rejected
+
+    assert asyncio.run(run()) == [('a', False, 'rejected')]
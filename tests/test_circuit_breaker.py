@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError  # noqa: E402
+from gopher_client import GopherClient  # noqa: E402
+
+
+class ManualClockBreaker(CircuitBreaker):
+    now = 0.0
+
+    def _now(self) -> float:
+        return self.now
+
+
+def open_breaker(**kwargs) -> ManualClockBreaker:
+    breaker = ManualClockBreaker(window=4, min_calls=4, reset_timeout=30, **kwargs)
+    for success in (True, False, True, False):
+        breaker.before_call()
+        breaker.record(success, 0.1)
+    assert breaker.state == OPEN
+    return breaker
+
+
+def test_half_open_lets_one_probe_through_at_a_time():
+    breaker = open_breaker()
+    with pytest.raises(CircuitOpenError) as refused:
+        breaker.before_call()
+    assert refused.value.retry_in == 30
+
+    breaker.now = 30
+    assert breaker.allows()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allows()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_or_slow_probe_opens_the_circuit_again():
+    breaker = open_breaker(slow_call_seconds=5)
+    breaker.now = 30
+    breaker.before_call()
+    breaker.record(False, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.opened_at == 30
+
+    breaker.now = 60
+    breaker.before_call()
+    breaker.record(True, 5)
+    assert breaker.state == OPEN
+    assert not breaker.allows()
+
+
+def test_outcome_of_a_call_admitted_before_opening_is_ignored():
+    breaker = open_breaker()
+    breaker.record(True, 0.1)
+    assert breaker.state == OPEN
+    assert breaker.opened_at == 0
+
+
+def test_cancelled_probe_is_released():
+    async def run():
+        breaker = open_breaker()
+        breaker.now = 30
+        client = GopherClient("http://gopher.test", "token", breaker=breaker)
+        started = asyncio.Event()
+
+        async def hang(request):
+            started.set()
+            await asyncio.sleep(3600)
+
+        await client._client.aclose()
+        client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(hang))
+        probe = asyncio.create_task(client.start_search({}))
+        await started.wait()
+        assert not breaker.allows()
+
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        await client.aclose()
+        return breaker
+
+    breaker = asyncio.run(run())
+    # Still half-open, and the next call may probe
+    assert breaker.state == HALF_OPEN
+    assert breaker.allows()
+    breaker.before_call()
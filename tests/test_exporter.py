@@ -0,0 +1,31 @@
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from exporter import ExportWriter, tweet_row  # noqa: E402
+
+
+def test_status_url_needs_a_tweet_id():
+    row = tweet_row({'id': 'abc-1', 'content': "hi", 'metadata': {'username': "gopher"}})
+    assert row['tweet_id'] is None and row['item_id'] == 'abc-1' and row['url'] is None
+
+    row = tweet_row({'id': '7', 'content': "hi", 'metadata': {'username': "gopher", 'tweet_id': '123'}})
+    assert row['url'] == "https://twitter.com/gopher/status/123"
+
+
+def test_repeated_items_are_written_once(tmp_path):
+    path = str(tmp_path / "export.csv")
+    writer = ExportWriter(path, 'csv', 'searchbyquery')
+    page = [
+        {'id': 'a', 'content': "no tweet id", 'metadata': {'username': "gopher"}},
+        {'id': '1', 'content': "tweet", 'metadata': {'username': "gopher", 'tweet_id': '100'}},
+    ]
+    assert writer.write(page) == 2
+    assert writer.write(page) == 0
+    writer.close()
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['item_id'] for row in rows] == ['a', '1']
+    assert writer.duplicates == 2
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from outbound import OutboundScheduler, ProgressTracker  # noqa: E402
+
+
+class FakeBot:
+    def __init__(self) -> None:
+        self.edits = []
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        self.edits.append((text, kwargs.get('reply_markup')))
+
+
+class FakeStatus:
+    message_id = 2
+
+
+class FakeMessage:
+    chat_id = 42
+
+    def __init__(self, bot: FakeBot) -> None:
+        self.bot = bot
+
+    def get_bot(self) -> FakeBot:
+        return self.bot
+
+    async def reply_text(self, text, **kwargs):
+        return FakeStatus()
+
+
+def test_finish_cancels_progress_edit_queued_behind_chat_limit():
+    async def run():
+        # One message per 10 s for the chat: the progress edit has to wait in the queue
+        scheduler = OutboundScheduler(chat_rate=0.1, chat_burst=1)
+        bot = FakeBot()
+        progress = ProgressTracker(scheduler, FakeMessage(bot), min_interval=0)
+        await progress.start("Starting search...")
+        progress.update("Processing... (check 3)")
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert scheduler.depth() == 1
+
+        # Let the chat bucket refill so the final edit can go out
+        bucket = scheduler._buckets[42]
+        bucket.capacity = bucket.tokens = 3
+        await progress.finish("RESULTS PAGE 1", reply_markup="buttons")
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        return bot.edits
+
+    assert asyncio.run(run()) == [("RESULTS PAGE 1", "buttons")]
+
+
+def test_updates_during_queued_edit_are_shown_afterwards():
+    async def run():
+        scheduler = OutboundScheduler()
+        bot = FakeBot()
+        progress = ProgressTracker(scheduler, FakeMessage(bot), min_interval=0)
+        await progress.start("Starting search...")
+        progress.update("check 1")
+        for _ in range(3):
+            await asyncio.sleep(0)
+        progress.update("check 2")
+        await asyncio.sleep(0.05)
+        await scheduler.stop()
+        return [text for text, _ in bot.edits]
+
+    assert asyncio.run(run()) == ["check 1", "check 2"]
+
+
+def test_processes_split_the_global_rate():
+    async def run():
+        # Three processes sharing a 30/s budget: this one may send 10/s
+        scheduler = OutboundScheduler(global_rate=30.0, chat_rate=1000.0, chat_burst=1000.0, share=1 / 3)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        async def noop():
+            return None
+
+        await asyncio.gather(*(scheduler.send(chat_id, noop) for chat_id in range(20)))
+        elapsed = loop.time() - started
+        await scheduler.stop()
+        return elapsed
+
+    # A burst of 10, then 10 more at 10/s
+    assert asyncio.run(run()) >= 0.9
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from renderer import MESSAGE_LIMIT, fit_blocks, pack_chunks, render_items  # noqa: E402
+from result_model import TweetRecord  # noqa: E402
+
+
+def lazy_blocks(records, start):
+    """Render records one at a time from start, counting how many were rendered"""
+    for i, record in enumerate(records[start:], start + 1):
+        lazy_blocks.rendered += 1
+        yield render_items([record], i)[0]
+
+
+def test_pages_split_where_items_stop_fitting():
+    # Long posts with long usernames: five of them do not fit in one message
+    records = [
+        TweetRecord(1000 + i, "x" * 280, "u" * 900, 1700000000, likes=i)
+        for i in range(12)
+    ]
+    head = "HEADER\n\n"
+    starts = [0]
+    shown = []
+    while starts[-1] < len(records):
+        start = starts[-1]
+        lazy_blocks.rendered = 0
+        blocks = fit_blocks(head, lazy_blocks(records, start), per_page=5)
+        end = start + len(blocks)
+        assert 0 < len(blocks) <= 5
+        # Only the page and the one block that did not fit are rendered
+        assert lazy_blocks.rendered <= len(blocks) + 1
+        chunks = pack_chunks(head, blocks)
+        # Every page fits in one message, so nothing is dropped from it
+        assert len(chunks) == 1 and len(chunks[0]) <= MESSAGE_LIMIT
+        shown.extend(f"[{i}]" in chunks[0] for i in range(start + 1, end + 1))
+        starts.append(end)
+    assert len(starts) > 12 // 5 + 2
+    assert len(shown) == len(records) and all(shown)
+
+
+def test_short_items_page_by_count():
+    records = [TweetRecord(i, "hello", "user", 1700000000) for i in range(12)]
+    lazy_blocks.rendered = 0
+    assert len(fit_blocks("HEADER\n\n", lazy_blocks(records, 0), per_page=5)) == 5
+    assert lazy_blocks.rendered == 5
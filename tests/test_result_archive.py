@@ -0,0 +1,50 @@
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from result_archive import ResultArchive  # noqa: E402
+
+
+def tweet(i: int, likes: int = 0) -> dict:
+    return {
+        'id': f"item-{i}",
+        'content': f"gopher news number {i}",
+        'metadata': {'tweet_id': str(1000 + i), 'username': "gopher", 'public_metrics': {'like_count': likes}},
+    }
+
+
+def test_refetched_tweets_are_stored_once(tmp_path):
+    archive = ResultArchive(str(tmp_path / "archive.db"), flush_interval=0.01)
+    for likes in range(200):
+        archive.archive_items('twitter', 'searchbyquery', 'gopher', [tweet(i, likes) for i in range(3)])
+    archive.archive_items('twitter', 'searchbyquery', 'gopher', [tweet(i) for i in range(3, 53)])
+    archive.close()
+
+    archive = ResultArchive(str(tmp_path / "archive.db"))
+    found = archive.find("gopher", 50)
+    assert len(found) == 50
+    assert len({record.id for record in archive.find("gopher", 100)}) == 53
+    # Refetching updated the counts
+    assert {record.likes for record in archive.find("number 1", 100) if record.id == 1001} == {199}
+    archive.close()
+
+
+def test_repeats_in_an_older_archive_are_removed(tmp_path):
+    path = str(tmp_path / "archive.db")
+    archive = ResultArchive(path, flush_interval=0.01)
+    archive.close()
+    db = sqlite3.connect(path)
+    db.execute("DROP INDEX items_key")
+    for _ in range(3):
+        db.execute(
+            "INSERT INTO items (item_id, tweet_id, content, username, query, fetched_at) "
+            "VALUES ('item-1', '1001', 'gopher repeated', 'gopher', 'gopher', 0)"
+        )
+    db.commit()
+    db.close()
+
+    archive = ResultArchive(path)
+    assert len(archive.find("repeated")) == 1
+    archive.close()
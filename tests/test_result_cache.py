@@ -0,0 +1,110 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import result_cache  # noqa: E402
+from result_cache import ResultCache, SingleFlight  # noqa: E402
+
+KEY = ('twitter', 'searchbyquery', 'gopher', 10)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_entry_goes_stale_then_only_serves_fallback(clock):
+    cache = ResultCache(ttls={'searchbyquery': 100}, stale_factor=0.5, fallback_ttl=1000)
+    cache.set(KEY, 'result', 10)
+    assert cache.get(KEY) == ('result', False)
+
+    # Stale for another 50s, with one background refresh at a time
+    clock[0] += 100
+    assert cache.get(KEY) == ('result', True)
+    assert cache.begin_refresh(KEY)
+    assert not cache.begin_refresh(KEY)
+    cache.end_refresh(KEY)
+    assert cache.begin_refresh(KEY)
+
+    # Expired, but kept for fallback_ttl while the API is down
+    clock[0] += 50
+    assert cache.get(KEY) is None
+    assert KEY not in cache
+    assert cache.get_fallback(KEY) == ('result', 150)
+    assert len(cache) == 1
+
+    clock[0] += 1000
+    assert cache.get_fallback(KEY) is None
+    assert len(cache) == 0
+    assert cache.total_bytes == 0
+
+
+def test_set_restarts_the_windows(clock):
+    cache = ResultCache(ttls={'searchbyquery': 100}, stale_factor=0, fallback_ttl=0)
+    cache.set(KEY, 'old', 10)
+    clock[0] += 90
+    cache.set(KEY, 'new', 20)
+    clock[0] += 90
+    assert cache.get(KEY) == ('new', False)
+    assert cache.total_bytes == 20
+
+
+def test_concurrent_callers_share_one_call():
+    async def run():
+        flight = SingleFlight()
+        calls = 0
+
+        async def search():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        results = await asyncio.gather(*(flight.do(KEY, search) for _ in range(5)))
+        return results, calls, len(flight)
+
+    assert asyncio.run(run()) == ([1] * 5, 1, 0)
+
+
+def test_cancelled_caller_leaves_the_call_running_for_others():
+    async def run():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def search():
+            await release.wait()
+            return 'result'
+
+        impatient = asyncio.create_task(flight.do(KEY, search))
+        patient = asyncio.create_task(flight.do(KEY, search))
+        await asyncio.sleep(0)
+        impatient.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return impatient.cancelled(), await patient
+
+    assert asyncio.run(run()) == (True, 'result')
+
+
+def test_failed_call_is_forgotten():
+    async def run():
+        flight = SingleFlight()
+
+        async def failing():
+            raise RuntimeError('upstream down')
+
+        async def succeeding():
+            return 'result'
+
+        with pytest.raises(RuntimeError):
+            await flight.do(KEY, failing)
+        assert KEY not in flight
+        return await flight.do(KEY, succeeding)
+
+    assert asyncio.run(run()) == 'result'
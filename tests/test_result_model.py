@@ -0,0 +1,42 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from gopher_client import GopherResult  # noqa: E402
+from renderer import render_items  # noqa: E402
+from result_model import parse_item, parse_timestamp, record_from_row, records_nbytes  # noqa: E402
+
+
+def test_naive_timestamps_are_utc():
+    assert parse_timestamp("2024-01-02T03:04:05") == 1704164645
+    assert parse_timestamp("2024-01-02T03:04:05Z") == 1704164645
+    assert parse_timestamp("2024-01-02T05:04:05+02:00") == 1704164645
+    assert parse_timestamp("Tue Jan 02 03:04:05 +0000 2024") == 1704164645
+
+
+def test_item_id_is_not_used_as_tweet_id():
+    record = parse_item('searchbyquery', {'id': 'abc-1', 'content': "hi", 'metadata': {'username': "gopher"}})
+    assert record.id is None and record.key == 'abc-1'
+    text = render_items([record])[0]
+    assert "/status/" not in text and "🆔 ID: abc-1" in text
+
+    record = record_from_row(parse_item('searchbyquery', {
+        'id': '7', 'content': "hi", 'metadata': {'username': "gopher", 'tweet_id': '123'}
+    }).to_row())
+    assert (record.id, record.item_id) == (123, 7)
+    assert "https://twitter.com/gopher/status/123" in render_items([record])[0]
+
+
+def test_compacted_result_is_charged_for_its_records():
+    items = [
+        {'id': str(i), 'content': "x" * 100,
+         'metadata': {'tweet_id': str(10 ** 18 + i), 'username': "gopher", 'lang': "en", 'entities': {}}}
+        for i in range(50)
+    ]
+    body = json.dumps({'status': "done", 'data': items}).encode()
+    result = GopherResult(json.loads(body), "uuid", body)
+    result.compact('searchbyquery')
+    assert result.nbytes == records_nbytes(result.items)
+    assert result.nbytes > sum(sys.getsizeof(record.content) for record in result.items)
@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from session_store import SessionStore, SQLiteSessionStore  # noqa: E402
+
+
+def test_base_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_sqlite_store_counts_without_rescanning(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), max_size=3)
+    for user_id in range(3):
+        store.set(user_id, {'n': user_id})
+    store.set(1, {'n': 10})
+    assert len(store) == 3
+
+    # Over the bound the least recently written session goes
+    store.set(3, {'n': 3})
+    assert len(store) == 3
+    assert store.get(0) is None
+    assert store.get(1) == {'n': 10}
+
+    store.delete(1)
+    store.delete(1)
+    assert len(store) == 2
+    store.close()
+
+
+def test_sweep_bounds_a_table_shared_by_processes(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path, ttl=0.2, max_size=2)
+    other = SQLiteSessionStore(path, ttl=0.2, max_size=2)
+    for user_id in range(2):
+        store.set(user_id, {})
+        other.set(10 + user_id, {})
+    # Each process only counted its own rows
+    assert len(store) == 2
+
+    assert store.sweep() == 0
+    assert len(store) == 2
+    assert store.get(0) is None and store.get(11) is not None
+
+    time.sleep(0.25)
+    assert store.sweep() == 2
+    assert len(store) == 0
+    store.close()
+    other.close()
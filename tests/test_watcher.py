@@ -0,0 +1,63 @@
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from result_cache import make_cache_key  # noqa: E402
+from watcher import WatchManager  # noqa: E402
+
+
+def search_data(query):
+    return {'type': 'twitter', 'arguments': {'type': 'searchbyquery', 'query': query, 'max_results': 10}}
+
+
+def make_manager(path, max_per_user=10):
+    async def fetch(search_data):
+        return []
+
+    async def deliver(chat_id, query, items):
+        pass
+
+    return WatchManager(fetch, deliver, make_cache_key, lambda item: item.get('id'), path=str(path),
+                        max_per_user=max_per_user)
+
+
+def test_query_variants_are_one_watch(tmp_path):
+    watches = make_manager(tmp_path / "watches.db", max_per_user=2)
+    assert watches.add(1, 100, "foo", search_data("foo"))
+    assert not watches.add(1, 100, "Foo", search_data("Foo"))
+    assert watches.list(1) == ["foo"]
+
+    # The variant did not use up a slot
+    assert watches.add(1, 100, "bar", search_data("bar"))
+    with pytest.raises(ValueError):
+        watches.add(1, 100, "baz", search_data("baz"))
+
+    assert watches.remove(1, search_data("  FOO "))
+    assert watches.list(1) == ["bar"]
+    assert len(watches) == 1
+    assert not watches.remove(1, search_data("foo"))
+
+
+def test_rows_keyed_by_query_are_merged(tmp_path):
+    path = str(tmp_path / "watches.db")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE watches (user_id INTEGER NOT NULL, chat_id INTEGER NOT NULL, query TEXT NOT NULL, "
+        "search_data TEXT NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (user_id, query))"
+    )
+    db.executemany(
+        "INSERT INTO watches VALUES (?, ?, ?, ?, ?)",
+        [(1, 100, query, json.dumps(search_data(query)), created_at)
+         for query, created_at in (("foo", 1.0), ("Foo", 2.0), ("bar", 3.0))]
+    )
+    db.commit()
+    db.close()
+
+    watches = make_manager(path)
+    assert watches.list(1) == ["foo", "bar"]
+    assert not watches.add(1, 100, "FOO", search_data("FOO"))
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from work_queue import SQLiteWorkQueue  # noqa: E402
+
+
+def test_renewed_lease_keeps_job_from_other_workers(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "jobs.db"), lease_seconds=0.2)
+    job_id = queue.enqueue({'n': 1})
+    assert queue.claim("a")[0] == job_id
+    for _ in range(3):
+        time.sleep(0.1)
+        assert queue.renew(job_id, "a")
+        assert queue.claim("b") is None
+
+    # Without renewal the lease runs out and another worker takes over
+    time.sleep(0.3)
+    assert queue.claim("b")[0] == job_id
+    assert not queue.renew(job_id, "a")
+    queue.close()
+
+
+def test_job_whose_lease_keeps_expiring_is_parked(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "jobs.db"), lease_seconds=0.05, max_attempts=2)
+    doomed = queue.enqueue({'n': 1})
+    assert queue.claim("a") == (doomed, {'n': 1}, 1)
+    time.sleep(0.1)
+    assert queue.claim("b") == (doomed, {'n': 1}, 2)
+    time.sleep(0.1)
+
+    # Out of attempts: the next worker skips it and takes the job behind it
+    later = queue.enqueue({'n': 2})
+    assert queue.claim("c")[0] == later
+    assert not queue.renew(doomed, "b")
+    queue.complete(later)
+    assert queue.depth() == 0
+    queue.close()
+
+
+def test_failed_job_is_retried_until_attempts_run_out(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+    job_id = queue.enqueue({'n': 1})
+    for attempt in (1, 2):
+        assert queue.claim("a") == (job_id, {'n': 1}, attempt)
+        queue.fail(job_id, "boom")
+    assert queue.claim("a") is None
+    assert queue.depth() == 0
+    queue.close()
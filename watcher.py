@@ -0,0 +1,241 @@
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import random
+import sqlite3
+import time
+from collections import OrderedDict
+
+from gopher_client import GopherSearchError
+
+logger = logging.getLogger(__name__)
+
+# Failures that say nothing about the watched query: retry at the same pace
+NO_BACKOFF_KINDS = ('rejected', 'circuit_open')
+
+# One row per user and normalized query (key_func), so case or spacing variants are one watch
+_CREATE_WATCHES = (
+    "CREATE TABLE IF NOT EXISTS watches ("
+    "user_id INTEGER NOT NULL, "
+    "chat_id INTEGER NOT NULL, "
+    "watch_key TEXT NOT NULL, "
+    "query TEXT NOT NULL, "
+    "search_data TEXT NOT NULL, "
+    "created_at REAL NOT NULL, "
+    "PRIMARY KEY (user_id, watch_key))"
+)
+
+
+class _WatchedQuery:
+    """One distinct normalized query and everyone watching it"""
+
+    __slots__ = ('key', 'search_data', 'subscribers', 'seen', 'seeded', 'interval', 'version')
+
+    def __init__(self, key, search_data: dict, interval: float) -> None:
+        self.key = key
+        self.search_data = search_data
+        self.subscribers = {}
+        self.seen = OrderedDict()
+        self.seeded = False
+        self.interval = interval
+        self.version = 0
+
+
+class WatchManager:
+    """Periodic /watch refresher shared by every user watching the same query.
+
+    Each distinct query (by key_func) is fetched once per interval no matter how
+    many users watch it; only items whose ID was not seen before are delivered.
+    The interval halves after a refresh that found something new and grows by
+    half after one that did not, within [min_interval, max_interval].
+    Subscriptions are kept in SQLite; seen IDs are rebuilt by the first refresh.
+    """
+
+    def __init__(self, fetch, deliver, key_func, item_key, path: str = "watches.db",
+                 interval: float = 300, min_interval: float = 120, max_interval: float = 3600,
+                 max_per_user: int = 10, seen_limit: int = 5000) -> None:
+        self.fetch = fetch
+        self.deliver = deliver
+        self.key_func = key_func
+        self.item_key = item_key
+        self.interval = interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_per_user = max_per_user
+        self.seen_limit = seen_limit
+        self._queries = {}
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._runner = None
+        self._tasks = set()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(_CREATE_WATCHES)
+        if 'watch_key' not in [row[1] for row in self._db.execute("PRAGMA table_info(watches)")]:
+            self._migrate()
+
+    def _watch_key(self, search_data: dict) -> str:
+        """Stored form of key_func(search_data)"""
+        return json.dumps(self.key_func(search_data))
+
+    def _migrate(self) -> None:
+        """Re-key rows saved by query as typed, keeping the oldest of each normalized query"""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            rows = self._db.execute(
+                "SELECT user_id, chat_id, query, search_data, created_at FROM watches ORDER BY created_at"
+            ).fetchall()
+            self._db.execute("DROP TABLE watches")
+            self._db.execute(_CREATE_WATCHES)
+            self._db.executemany(
+                "INSERT OR IGNORE INTO watches (user_id, chat_id, watch_key, query, search_data, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(user_id, chat_id, self._watch_key(json.loads(search_data)), query, search_data, created_at)
+                 for user_id, chat_id, query, search_data, created_at in rows]
+            )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def __len__(self) -> int:
+        """Number of distinct queries being refreshed"""
+        return len(self._queries)
+
+    def start(self) -> None:
+        """Load saved subscriptions and start refreshing"""
+        for user_id, chat_id, query, search_data in self._db.execute(
+            "SELECT user_id, chat_id, query, search_data FROM watches ORDER BY created_at"
+        ).fetchall():
+            self._subscribe(user_id, chat_id, query, json.loads(search_data))
+        self._runner = asyncio.get_running_loop().create_task(self._run())
+        logger.info("Watching %s distinct queries", len(self._queries))
+
+    def _subscribe(self, user_id: int, chat_id: int, query: str, search_data: dict) -> bool:
+        key = self.key_func(search_data)
+        watched = self._queries.get(key)
+        if watched is None:
+            watched = _WatchedQuery(key, search_data, self.interval)
+            self._queries[key] = watched
+            # First refresh soon, to learn what is already there
+            self._schedule(watched, random.uniform(1, 10))
+        new = user_id not in watched.subscribers
+        watched.subscribers[user_id] = (chat_id, query)
+        return new
+
+    def add(self, user_id: int, chat_id: int, query: str, search_data: dict) -> bool:
+        """Watch a query for a user; False if already watched. Raises ValueError over the limit."""
+        watch_key = self._watch_key(search_data)
+        if self._db.execute(
+            "SELECT 1 FROM watches WHERE user_id = ? AND watch_key = ?", (user_id, watch_key)
+        ).fetchone():
+            return False
+        if len(self.list(user_id)) >= self.max_per_user:
+            raise ValueError(f"at most {self.max_per_user} watches per user")
+        self._db.execute(
+            "INSERT INTO watches (user_id, chat_id, watch_key, query, search_data, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, chat_id, watch_key, query, json.dumps(search_data), time.time())
+        )
+        return self._subscribe(user_id, chat_id, query, search_data)
+
+    def remove(self, user_id: int, search_data: dict) -> bool:
+        """Stop watching; False if the user was not watching this query"""
+        cursor = self._db.execute(
+            "DELETE FROM watches WHERE user_id = ? AND watch_key = ?", (user_id, self._watch_key(search_data))
+        )
+        key = self.key_func(search_data)
+        watched = self._queries.get(key)
+        if watched is not None and watched.subscribers.pop(user_id, None) is not None and not watched.subscribers:
+            # Its heap entry is skipped when it comes due
+            del self._queries[key]
+        return cursor.rowcount > 0
+
+    def list(self, user_id: int) -> list:
+        """Queries the user is watching, oldest first"""
+        return [query for (query,) in self._db.execute(
+            "SELECT query FROM watches WHERE user_id = ? ORDER BY created_at", (user_id,)
+        ).fetchall()]
+
+    def _schedule(self, watched: _WatchedQuery, delay: float) -> None:
+        watched.version += 1
+        due = time.monotonic() + delay
+        heapq.heappush(self._heap, (due, next(self._seq), watched.key, watched.version))
+        self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            due, _, key, version = self._heap[0]
+            wait = due - time.monotonic()
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            watched = self._queries.get(key)
+            if watched is None or watched.version != version:
+                continue
+            task = asyncio.get_running_loop().create_task(self._refresh(watched))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, watched: _WatchedQuery) -> None:
+        try:
+            await self._fetch_new(watched)
+        except Exception as e:
+            logger.error("Watch refresh of %s failed: %s", watched.key, e)
+            if not (isinstance(e, GopherSearchError) and e.kind in NO_BACKOFF_KINDS):
+                watched.interval = min(self.max_interval, watched.interval * 2)
+        if self._queries.get(watched.key) is watched:
+            self._schedule(watched, watched.interval * random.uniform(0.9, 1.1))
+
+    async def _fetch_new(self, watched: _WatchedQuery) -> None:
+        items = await self.fetch(watched.search_data)
+        new_items = []
+        for item in items:
+            item_id = self.item_key(item)
+            if item_id is None or item_id in watched.seen:
+                continue
+            watched.seen[item_id] = None
+            new_items.append(item)
+        while len(watched.seen) > self.seen_limit:
+            watched.seen.popitem(last=False)
+
+        if not watched.seeded:
+            # Everything present at the first refresh counts as already seen
+            watched.seeded = True
+            return
+        if new_items:
+            watched.interval = max(self.min_interval, watched.interval / 2)
+        else:
+            watched.interval = min(self.max_interval, watched.interval * 1.5)
+        logger.info("Watch %s: %s new, next in %.0fs", watched.key, len(new_items), watched.interval)
+        if not new_items:
+            return
+        subscribers = list(watched.subscribers.items())
+        results = await asyncio.gather(
+            *(self.deliver(chat_id, query, new_items) for _, (chat_id, query) in subscribers),
+            return_exceptions=True
+        )
+        for (user_id, _), result in zip(subscribers, results):
+            if isinstance(result, Exception):
+                logger.warning("Could not deliver watch results to %s: %s", user_id, result)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            await asyncio.gather(self._runner, return_exceptions=True)
+            self._runner = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._db.close()
@@ -0,0 +1,117 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteWorkQueue:
+    """Durable job queue in a local SQLite file shared by front-end and worker processes.
+
+    Workers claim jobs under a lease and renew() it while the job runs; a job whose
+    worker dies is handed out again once its lease runs out, up to max_attempts times.
+    """
+
+    def __init__(self, path: str = "jobs.db", lease_seconds: float = 180, max_attempts: int = 3) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "payload TEXT NOT NULL, "
+            "status TEXT NOT NULL DEFAULT 'queued', "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "lease_until REAL, "
+            "worker TEXT, "
+            "error TEXT, "
+            "created_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+    def enqueue(self, payload: dict) -> int:
+        """Add a job and return its id"""
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO jobs (payload, created_at) VALUES (?, ?)",
+                (json.dumps(payload), time.time())
+            )
+            return cursor.lastrowid
+
+    def claim(self, worker: str):
+        """Lease the oldest runnable job; returns (job_id, payload, attempt) or None"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    row = self._db.execute(
+                        "SELECT id, payload, attempts FROM jobs "
+                        "WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                        "ORDER BY id LIMIT 1",
+                        (now,)
+                    ).fetchone()
+                    if row is None:
+                        self._db.execute("COMMIT")
+                        return None
+
+                    job_id, payload, attempts = row
+                    if attempts < self.max_attempts:
+                        break
+                    # Its workers kept dying mid-job; park it instead of crashing the next one
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'failed', error = 'lease expired too often' WHERE id = ?",
+                        (job_id,)
+                    )
+                    logger.error("Job %s abandoned after %s attempts", job_id, attempts)
+
+                self._db.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                    "lease_until = ?, worker = ? WHERE id = ?",
+                    (now + self.lease_seconds, worker, job_id)
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return job_id, json.loads(payload), attempts + 1
+
+    def renew(self, job_id: int, worker: str) -> bool:
+        """Extend the lease of a job this worker is still running; False if it has lost the job"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + self.lease_seconds, job_id, worker)
+            )
+            return cursor.rowcount > 0
+
+    def complete(self, job_id: int) -> None:
+        """Remove a finished job"""
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def fail(self, job_id: int, error: str) -> None:
+        """Requeue a job after a worker error, or mark it failed once attempts run out"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END, "
+                "lease_until = NULL, error = ? WHERE id = ?",
+                (self.max_attempts, error[:1000], job_id)
+            )
+
+    def depth(self) -> int:
+        """Number of jobs waiting or running"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()